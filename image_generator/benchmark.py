@@ -0,0 +1,75 @@
+"""
+Compares the title image renderers.
+
+    python -m image_generator.benchmark --count 20 --workers 2
+
+The browser renderer is timed for its first image, which includes launching the
+browser, and for the remaining images from the warm driver pool, rendered sequentially
+and concurrently. The Pillow renderer is timed the same way.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from .driver_pool import DriverPool
+from .image_generator import ImageGenerator
+
+TITLE = "AITA for telling my roommate that the rent increase was her idea all along?"
+AUTHOR = "throwaway_benchmark"
+SUBREDDIT = "AmItheAsshole"
+
+
+def time_renders(
+    render: Callable[[], str], count: int, workers: int
+) -> Dict[str, float]:
+    """
+    Times a first render, then count sequential and count concurrent renders.
+    """
+    start = time.perf_counter()
+    render()
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        render()
+    sequential = (time.perf_counter() - start) / count
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda _: render(), range(count)))
+    concurrent = (time.perf_counter() - start) / count
+
+    return {"first": first, "sequential": sequential, "concurrent": concurrent}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--skip-browser", action="store_true")
+    args = parser.parse_args()
+
+    renderers = ["pillow"] if args.skip_browser else ["browser", "pillow"]
+    for renderer in renderers:
+        pool = DriverPool(size=args.workers)
+        generator = ImageGenerator(renderer=renderer, driver_pool=pool)
+        try:
+            timings = time_renders(
+                lambda: generator.generate_reddit_title_image(TITLE, AUTHOR, SUBREDDIT),
+                args.count,
+                args.workers,
+            )
+        finally:
+            pool.close()
+
+        print(
+            f"{renderer:>8}: first {timings['first'] * 1000:8.1f} ms, "
+            f"sequential {timings['sequential'] * 1000:8.1f} ms/image, "
+            f"concurrent {timings['concurrent'] * 1000:8.1f} ms/image"
+        )
+
+
+if __name__ == "__main__":
+    main()
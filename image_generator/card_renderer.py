@@ -0,0 +1,194 @@
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Arial or a metric-compatible font, as used by the reddit.html card, by platform
+FONT_CANDIDATES = {
+    False: [
+        "C:/Windows/Fonts/arial.ttf",
+        "/System/Library/Fonts/Supplemental/Arial.ttf",
+        "/Library/Fonts/Arial.ttf",
+        "/usr/share/fonts/truetype/msttcorefonts/Arial.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+        "/usr/share/fonts/liberation-sans/LiberationSans-Regular.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    ],
+    True: [
+        "C:/Windows/Fonts/arialbd.ttf",
+        "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
+        "/Library/Fonts/Arial Bold.ttf",
+        "/usr/share/fonts/truetype/msttcorefonts/Arial_Bold.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+        "/usr/share/fonts/liberation-sans/LiberationSans-Bold.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    ],
+}
+
+# Layout of the reddit.html card in CSS pixels
+CARD_WIDTH = 600
+PADDING = 15
+BORDER = 1
+HEADER_HEIGHT = 30
+HEADER_MARGIN = 10
+NAME_MARGIN = 10
+NAME_SIZE = 16
+AUTHOR_SIZE = 14.4
+TITLE_SIZE = 19.2
+TITLE_LINE_HEIGHT = 1.4
+TITLE_MARGIN = 10
+LOGO_SIZE = 30
+
+BACKGROUND_COLOR = "#ffffff"
+BORDER_COLOR = "#e1e1e1"
+NAME_COLOR = "#0079d3"
+AUTHOR_COLOR = "#555555"
+TITLE_COLOR = "#333333"
+LOGO_COLOR = "#ff4500"
+
+
+@lru_cache(maxsize=None)
+def get_font(size: float, bold: bool = False) -> ImageFont.FreeTypeFont:
+    """
+    Returns the card font at the given pixel size. The font file can be set with the
+    CARD_FONT and CARD_FONT_BOLD environment variables; otherwise Arial or a
+    metric-compatible font is looked up, falling back to Pillow's default font.
+    """
+    override = os.environ.get("CARD_FONT_BOLD" if bold else "CARD_FONT")
+    for path in ([override] if override else []) + FONT_CANDIDATES[bold]:
+        if os.path.isfile(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size)
+
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, width: float) -> List[str]:
+    """
+    Greedily wraps text into lines no wider than width, breaking words that don't fit
+    on a line of their own.
+    """
+    lines: List[str] = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if font.getlength(candidate) <= width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        line = ""
+        for char in word:
+            if line and font.getlength(line + char) > width:
+                lines.append(line)
+                line = ""
+            line += char
+    if line:
+        lines.append(line)
+    return lines or [""]
+
+
+def draw_logo(draw: ImageDraw.ImageDraw, x: float, y: float, size: float) -> None:
+    """
+    Draws a simplified Reddit logo in place of the remote image the template links to.
+    """
+    draw.ellipse((x, y, x + size, y + size), fill=LOGO_COLOR)
+    cx, cy = x + size / 2, y + size * 0.58
+    head_w, head_h = size * 0.62, size * 0.4
+    draw.ellipse(
+        (cx - head_w / 2, cy - head_h / 2, cx + head_w / 2, cy + head_h / 2),
+        fill="white",
+    )
+    eye = size * 0.07
+    for ex in (cx - head_w * 0.22, cx + head_w * 0.22):
+        draw.ellipse(
+            (ex - eye, cy - eye * 1.5, ex + eye, cy + eye * 0.5), fill=LOGO_COLOR
+        )
+    antenna = size * 0.06
+    ax, ay = cx + size * 0.14, y + size * 0.22
+    draw.line(
+        (cx, cy - head_h / 2, cx + size * 0.05, ay),
+        fill="white",
+        width=max(1, round(size / 30)),
+    )
+    draw.ellipse((ax - antenna, ay - antenna, ax + antenna, ay + antenna), fill="white")
+
+
+def render_reddit_card(
+    title: str,
+    author: str,
+    subreddit: str,
+    scale: float = 1.0,
+    supersample: int = 2,
+    logo: Optional[Image.Image] = None,
+) -> Image.Image:
+    """
+    Renders the reddit.html card layout natively with Pillow, with no browser.
+    Sizes follow the template's CSS pixels times scale. The card is drawn at supersample
+    times that size and downsampled, for smoother text and curves.
+    """
+    s = scale * supersample
+    name_font = get_font(NAME_SIZE * s, bold=True)
+    author_font = get_font(AUTHOR_SIZE * s)
+    title_font = get_font(TITLE_SIZE * s, bold=True)
+
+    width = round(CARD_WIDTH * s)
+    inset = (PADDING + BORDER) * s
+    content_width = width - 2 * inset
+    title_lines = wrap_text(title, title_font, content_width)
+    line_height = TITLE_SIZE * TITLE_LINE_HEIGHT * s
+
+    height = round(
+        2 * inset
+        + (HEADER_HEIGHT + HEADER_MARGIN) * s
+        + len(title_lines) * line_height
+        + TITLE_MARGIN * s
+    )
+    image = Image.new("RGB", (width, height), BACKGROUND_COLOR)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle(
+        (0, 0, width - 1, height - 1),
+        outline=BORDER_COLOR,
+        width=max(1, round(BORDER * s)),
+    )
+
+    # Header: subreddit and author on the left, logo on the right, vertically centered
+    header_mid = inset + HEADER_HEIGHT * s / 2
+    name = f"r/{subreddit}"
+    draw.text((inset, header_mid), name, font=name_font, fill=NAME_COLOR, anchor="lm")
+    author_x = inset + name_font.getlength(name) + NAME_MARGIN * s
+    draw.text(
+        (author_x, header_mid),
+        f"by u/{author}",
+        font=author_font,
+        fill=AUTHOR_COLOR,
+        anchor="lm",
+    )
+
+    logo_size = LOGO_SIZE * s
+    logo_x = width - inset - logo_size
+    logo_y = header_mid - logo_size / 2
+    if logo is not None:
+        logo = logo.convert("RGBA").resize(
+            (round(logo_size), round(logo_size)), Image.LANCZOS
+        )
+        image.paste(logo, (round(logo_x), round(logo_y)), logo)
+    else:
+        draw_logo(draw, logo_x, logo_y, logo_size)
+
+    # Title lines, each centered vertically in its line box like CSS line-height
+    y = inset + (HEADER_HEIGHT + HEADER_MARGIN) * s
+    for line in title_lines:
+        draw.text(
+            (inset, y + line_height / 2),
+            line,
+            font=title_font,
+            fill=TITLE_COLOR,
+            anchor="lm",
+        )
+        y += line_height
+
+    if supersample > 1:
+        image = image.resize(
+            (round(width / supersample), round(height / supersample)), Image.LANCZOS
+        )
+    return image
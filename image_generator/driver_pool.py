@@ -0,0 +1,154 @@
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+# Viewport the card template is laid out in, matching a maximized 1080p window
+WINDOW_SIZE = (1920, 1080)
+
+
+def create_headless_firefox() -> webdriver.Firefox:
+    """
+    Launches a headless Firefox with a fixed window size.
+    """
+    options = webdriver.FirefoxOptions()
+    options.add_argument("-headless")
+    driver = webdriver.Firefox(options=options)
+    driver.set_window_size(*WINDOW_SIZE)
+    return driver
+
+
+class DriverPool:
+    """
+    Pool of long-lived WebDriver sessions that are reused across renders.
+    Drivers are launched lazily, up to size of them, and a render waits for a free driver
+    when all of them are busy, so up to size renders can run concurrently.
+    A driver that fails is quit, and a render waiting for a driver launches a new one in
+    its place.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        factory: Callable[[], webdriver.Remote] = create_headless_firefox,
+    ):
+        self.size = size
+        self.factory = factory
+        self.idle: List[webdriver.Remote] = []
+        # Lent out and idle drivers, with None for the ones being launched
+        self.drivers: List[Optional[webdriver.Remote]] = []
+        self.lock = threading.Lock()
+        # Notified when a driver is returned, a slot is freed or the pool is closed
+        self.available = threading.Condition(self.lock)
+        self.closed = False
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[webdriver.Remote]:
+        """
+        Lends a driver for the duration of the with block.
+        Raises TimeoutError if no driver is free within timeout seconds.
+        """
+        driver = self.take(timeout)
+        try:
+            yield driver
+        except WebDriverException:
+            self.discard(driver)
+            raise
+        except BaseException:
+            self.release(driver)
+            raise
+        else:
+            self.release(driver)
+
+    def take(self, timeout: Optional[float]) -> webdriver.Remote:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.available:
+            while True:
+                if self.closed:
+                    raise RuntimeError("Driver pool is closed")
+                if self.idle:
+                    return self.idle.pop()
+                if len(self.drivers) < self.size:
+                    # Reserve the slot before launching, which takes seconds
+                    self.drivers.append(None)
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No WebDriver became free in time")
+                self.available.wait(remaining)
+
+        try:
+            driver = self.factory()
+        except BaseException:
+            with self.available:
+                self.drivers.remove(None)
+                self.available.notify()
+            raise
+        with self.available:
+            closed = self.closed
+            if not closed:
+                self.drivers[self.drivers.index(None)] = driver
+            else:
+                self.drivers.remove(None)
+        if closed:
+            driver.quit()
+            raise RuntimeError("Driver pool is closed")
+        return driver
+
+    def release(self, driver: webdriver.Remote) -> None:
+        with self.available:
+            closed = self.closed
+            if not closed:
+                self.idle.append(driver)
+                self.available.notify()
+        if closed:
+            self.discard(driver)
+
+    def discard(self, driver: webdriver.Remote) -> None:
+        with self.available:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+            # The freed slot lets a waiting render launch a replacement
+            self.available.notify()
+        try:
+            driver.quit()
+        except WebDriverException:
+            logging.warning("Failed to quit a broken WebDriver session")
+
+    def close(self) -> None:
+        """
+        Quits every driver in the pool. Drivers that are lent out are quit when they
+        are returned, and later acquires raise RuntimeError.
+        """
+        with self.available:
+            self.closed = True
+            drivers = self.idle
+            self.idle = []
+            for driver in drivers:
+                self.drivers.remove(driver)
+            self.available.notify_all()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+
+
+driver_pool: Optional[DriverPool] = None
+
+
+def get_driver_pool() -> DriverPool:
+    """
+    Returns the shared driver pool, creating it on first use.
+    Its drivers are quit when the interpreter exits.
+    """
+    global driver_pool
+    if driver_pool is None or driver_pool.closed:
+        driver_pool = DriverPool()
+        atexit.register(driver_pool.close)
+    return driver_pool
@@ -2,19 +2,86 @@ import os
 import uuid
 import io
 import logging
-from selenium import webdriver
+from typing import Dict, Optional
 from PIL import Image, ImageDraw
-from jinja2 import Environment
+from functools import lru_cache
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
 from markdown import markdown
 from markupsafe import Markup
 from base64 import b64encode
 
+from .card_renderer import render_reddit_card
+from .driver_pool import DriverPool, get_driver_pool
+
+# Scale of the title image relative to the template's CSS pixels
+TITLE_IMAGE_SCALE = 0.85
+
+ASSETS_DIR: str = os.path.join(os.path.dirname(__file__), "assets")
+# Compiled templates, so they aren't parsed again in new processes
+TEMPLATE_CACHE_DIR: str = os.path.join(os.path.dirname(__file__), "out", "jinja_cache")
+
+
+@lru_cache(maxsize=1024)
+def safe_markdown(text: str) -> Markup:
+    return Markup(markdown(text, extensions=["smarty"]))
+
+
+def strip_markdown(text: str) -> str:
+    """
+    Removes the <p> and </p> tags added by default.
+    """
+    return safe_markdown(text)[3:-4]
+
+
+@lru_cache(maxsize=64)
+def encode_image(img_path: str, mtime: float, size: int) -> str:
+    """
+    Encodes a local image as a base64 data URL. Memoized on the path, modification time
+    and size, so an image is only read again when it changes.
+    """
+    with open(img_path, "rb") as f:
+        img_str = str(b64encode(f.read()))[2:-1]
+    img_type = img_path[-3:]
+    return f"data:image/{img_type};base64,{img_str}"
+
+
+def img_encode(img_path: str) -> str:
+    """
+    Checks if a provided image is a local image or a remote image.
+    If local, encodes the image as a base64 string,
+    required for local images to display in the Chromedriver.
+    """
+    if not img_path:
+        return ""
+
+    if os.path.isfile(img_path):
+        stat = os.stat(img_path)
+        img_str = encode_image(img_path, stat.st_mtime, stat.st_size)
+    else:
+        logging.info(f"Downloading {img_path}")
+        img_str = img_path
+
+    return img_str
+
+
+# Shared Jinja2 environment, and environments by template directory
+jinja_env: Optional[Environment] = None
+template_envs: Dict[str, Environment] = {}
+
 
 # ImageGenerator is a class responsible for generating images from HTML templates using Jinja2 and Selenium.
+# With renderer="pillow", title images are drawn natively with Pillow instead, with no browser.
 class ImageGenerator:
-    def __init__(self):
+    def __init__(
+        self,
+        renderer: Optional[str] = None,
+        driver_pool: Optional[DriverPool] = None,
+    ):
         self.env = self.build_jinja_env()
-        self.driver = webdriver.Firefox()
+        self.renderer = renderer or os.environ.get("TITLE_IMAGE_RENDERER", "browser")
+        if self.renderer not in ("browser", "pillow"):
+            raise ValueError(f"Unknown title image renderer '{self.renderer}'")
+        self.driver_pool = driver_pool
         self.out_dir = os.path.join(os.path.dirname(__file__), "out")
         os.makedirs(self.out_dir, exist_ok=True)
 
@@ -23,58 +90,53 @@ class ImageGenerator:
 
     def build_jinja_env(self) -> Environment:
         """
-        Builds and returns a Jinja2 environment with custom filters for markdown processing and image encoding.
-        """
-
-        def safe_markdown(text: str) -> Markup:
-            return Markup(markdown(text, extensions=["smarty"]))
-
-        def strip_markdown(text: str) -> str:
-            """
-            Removes the <p> and </p> tags added by default.
-            """
-            return safe_markdown(text)[3:-4]
-
-        def img_encode(img_path: str) -> str:
-            """
-            Checks if a provided image is a local image or a remote image.
-            If local, encodes the image as a base64 string,
-            required for local images to display in the Chromedriver.
-            """
-            if not img_path:
-                return ""
-
-            if os.path.isfile(img_path):
-                with open(img_path, "rb") as f:
-                    img_str = str(b64encode(f.read()))[2:-1]
-                img_type = img_path[-3:]
-                img_str = f"data:image/{img_type};base64,{img_str}"
-            else:
-                logging.info(f"Downloading {img_path}")
-                img_str = img_path
-
-            return img_str
-
-        env = Environment()
-        env.filters.update(
-            {
-                "markdown": strip_markdown,
-                "markdown_nostrip": safe_markdown,
-                "img_encode": img_encode,
-            }
-        )
-        return env
+        Returns the Jinja2 environment with custom filters for markdown processing and image encoding.
+        The environment is shared by all generators, so each template is only parsed once.
+        """
+        global jinja_env
+        if jinja_env is None:
+            os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+            jinja_env = Environment(
+                loader=FileSystemLoader(ASSETS_DIR),
+                bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+            )
+            jinja_env.filters.update(
+                {
+                    "markdown": strip_markdown,
+                    "markdown_nostrip": safe_markdown,
+                    "img_encode": img_encode,
+                }
+            )
+            template_envs[ASSETS_DIR] = jinja_env
+        return jinja_env
+
+    def get_template(self, template: str) -> Template:
+        """
+        Returns the compiled template for a template name or path.
+        Templates outside the assets directory are loaded by an overlay of the environment
+        for their own directory, which shares its filters and bytecode cache.
+        """
+        path = os.path.abspath(self.get_template_path(template))
+        directory, name = os.path.split(path)
+        env = template_envs.get(directory)
+        if env is None:
+            env = self.env.overlay(loader=FileSystemLoader(directory))
+            template_envs[directory] = env
+        return env.get_template(name)
+
+    def render_template(self, template: str, data: dict) -> str:
+        """
+        Renders a given template with a data dictionary and returns the HTML.
+        """
+        return self.get_template(template).render(data)
 
     def generate_html_from_template(self, template: str, data: dict) -> str:
         """
         Generates an HTML file from a given template and data dictionary, writes the output to a file,
         and returns the file path.
         """
-        with open(template, "r", encoding="utf-8") as f:
-            template = self.env.from_string(f.read())
-
-        output = template.render(data)
-        output_file = self.get_output_path("rendered_html.html")
+        output = self.render_template(template, data)
+        output_file = self.get_output_path(f"rendered_{uuid.uuid4()}.html")
         with open(output_file, "w", encoding="utf-8") as file:
             file.write(output)
 
@@ -96,33 +158,60 @@ class ImageGenerator:
 
         return template
 
+    def render_reddit_title_image(
+        self, title: str, author: str, subreddit: str
+    ) -> Image.Image:
+        """
+        Renders an image for a Reddit post title in memory, either by rendering the template in a
+        pooled headless browser and capturing a screenshot, or by drawing the same layout with Pillow.
+        Returns the RGBA image with rounded corners.
+        """
+        if self.renderer == "pillow":
+            img = render_reddit_card(title, author, subreddit, scale=TITLE_IMAGE_SCALE)
+        else:
+            img = self.screenshot_reddit_card(title, author, subreddit)
+        return self.add_corners(img.convert("RGB"), 25)
+
     def generate_reddit_title_image(
         self, title: str, author: str, subreddit: str
     ) -> str:
         """
-        Generates an image for a Reddit post title using a template, renders it in a browser,
-        captures a screenshot, and saves the image with rounded corners. Returns the file path of the saved image.
+        Renders an image for a Reddit post title, saves it and returns its file path.
         """
-        template_path = self.get_template_path("reddit.html")
-        html_path = self.generate_html_from_template(
-            template_path, {"title": title, "author": author, "subreddit": subreddit}
-        )
-
-        self.driver.maximize_window()
-        self.driver.get("file://" + os.path.abspath(html_path))
+        img = self.render_reddit_title_image(title, author, subreddit)
 
-        element = self.driver.find_element(by="class name", value="reddit-box")
         fname = self.get_output_path(f"{uuid.uuid4()}.png")
-
-        img = Image.open(io.BytesIO(element.screenshot_as_png))
-        img = img.resize((int(img.width * 0.85), int(img.height * 0.85)))
-        img = self.add_corners(img, 25)
-
         img.save(fname)
-        self.quit_image_generator()
 
         return fname
 
+    def screenshot_reddit_card(
+        self, title: str, author: str, subreddit: str
+    ) -> Image.Image:
+        """
+        Renders the reddit.html template in a browser from the driver pool and returns a
+        screenshot of the card, scaled by TITLE_IMAGE_SCALE.
+        The page is loaded from a data: URL, so nothing is written to disk.
+        """
+        template_path = self.get_template_path("reddit.html")
+        html = self.render_template(
+            template_path, {"title": title, "author": author, "subreddit": subreddit}
+        )
+        url = "data:text/html;charset=utf-8;base64," + b64encode(
+            html.encode("utf-8")
+        ).decode("ascii")
+
+        pool = self.driver_pool or get_driver_pool()
+        with pool.acquire() as driver:
+            driver.get(url)
+            element = driver.find_element(by="class name", value="reddit-box")
+            png = element.screenshot_as_png
+
+        img = Image.open(io.BytesIO(png))
+        return img.resize(
+            (int(img.width * TITLE_IMAGE_SCALE), int(img.height * TITLE_IMAGE_SCALE))
+        )
+
     def add_corners(self, im: Image.Image, rad: int) -> Image.Image:
         """
         Adds rounded corners to an image and returns the modified image.
@@ -139,11 +228,15 @@ class ImageGenerator:
         alpha.paste(circle.crop((rad, rad, rad * 2, rad * 2)), (w - rad, h - rad))
 
         im.putalpha(alpha)
-        self.driver.close()
         return im
 
     def quit_image_generator(self):
         """
-        Closes and quits the Selenium WebDriver.
+        Quits the pooled Selenium WebDrivers. The pool launches new ones if it is used again.
         """
-        self.driver.quit()
+        if self.driver_pool is None:
+            get_driver_pool().close()
+            return
+        # A closed pool can't be reopened, so a caller's pool is replaced by a new one
+        self.driver_pool.close()
+        self.driver_pool = DriverPool(self.driver_pool.size, self.driver_pool.factory)
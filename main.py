@@ -1,97 +1,92 @@
-import os
-from crewai import Crew
-from video_generator import video_generator
-from image_generator.image_generator import ImageGenerator
-from langchain_openai import AzureChatOpenAI
-from reddit_video_generator_crew.agents.reddit_tools import reddit_search_tool
-
-from reddit_video_generator_crew.agents.copywriter import CopywriterAgent
-from reddit_video_generator_crew.agents.reddit_post_finder import RedditPostFinderAgent
-from reddit_video_generator_crew.agents.instagram_specialist import (
-    InstagramSpecialistAgent,
-)
-
-from reddit_video_generator_crew.tasks.find_reddit_post import FindRedditPostTask
-from reddit_video_generator_crew.tasks.write_voiceover_script import (
-    WriteVoiceoverScriptTask,
-)
-from reddit_video_generator_crew.tasks.write_instagram_hashtags import (
-    WriteInstagramHashtags,
-)
-
-from dotenv import load_dotenv
 import argparse
 
-load_dotenv(override=True)
-
-# Initialize models
-gpt4o_mini = AzureChatOpenAI(
-    model="azure/gpt-4o-mini",
-    api_version="2023-03-15-preview",
-    api_key=os.environ["AZURE_OPENAI_GPT4O_API_KEY"],
-)
-
-gpt4o = AzureChatOpenAI(
-    model="azure/gpt-4o",
-    api_version="2024-05-03-preview",
-    api_key=os.environ["AZURE_OPENAI_GPT4O_API_KEY"],
-)
-
-
-# Initilize agents
-reddit_post_finder = RedditPostFinderAgent([reddit_search_tool], gpt4o).get_agent()
-
-copywriter = CopywriterAgent(gpt4o_mini).get_agent()
-
-instagram_specialist = InstagramSpecialistAgent(gpt4o_mini).get_agent()
-
-
-# Initialize tasks
-find_reddit_post_task = FindRedditPostTask(reddit_post_finder).get_task()
-
-
-write_voiceover_transcript = WriteVoiceoverScriptTask(
-    context=[find_reddit_post_task], agent=copywriter
-).get_task()
-
-
-write_instagram_hashtags = WriteInstagramHashtags(
-    [write_voiceover_transcript], instagram_specialist
-).get_task()
-
-
-# Initialize the crew
-reddit_video_crew = Crew(
-    agents=[reddit_post_finder, copywriter, instagram_specialist],
-    tasks=[
-        find_reddit_post_task,
-        write_voiceover_transcript,
-        write_instagram_hashtags,
-    ],
-    verbose=True,
-)
-
-parser = argparse.ArgumentParser(description="Generate Reddit video from a subreddit")
-parser.add_argument("--post_sub", type=str, help="Subreddit to use for the post")
-args = parser.parse_args()
-
-post_sub = args.post_sub
-if not post_sub:
-    post_sub = input("Enter subreddit: ")
-
-print("Kicking off crew...")
-video_material = reddit_video_crew.kickoff(inputs={"post_sub": post_sub})
-
-print("Idea is ready, generating title image...")
-image_generator = ImageGenerator()
-fname = image_generator.generate_reddit_title_image(
-    video_material.pydantic.post_title,
-    video_material.pydantic.user,
-    video_material.pydantic.subreddit,
-)
-image_generator.quit_image_generator()
+from dotenv import load_dotenv
 
-print("Image is generated, generating video...")
-video_generator.generate_video(
-    fname, video_material.pydantic.post_content, video_material.pydantic.post_title
-)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate Reddit videos from one or more subreddits"
+    )
+    parser.add_argument("--post_sub", type=str, help="Subreddit to use for the post")
+    parser.add_argument(
+        "--subreddits",
+        type=str,
+        nargs="+",
+        help="Subreddits to make one video each for",
+    )
+    parser.add_argument(
+        "--jobs", type=str, help='JSONL file with one {"post_sub": ...} job per line'
+    )
+    parser.add_argument(
+        "--results",
+        type=str,
+        help="JSONL file to append one result record per job to "
+        "(defaults to batch_results.jsonl for batches)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap the jobs' crew, speech, title image and render stages",
+    )
+    parser.add_argument(
+        "--render_workers",
+        type=int,
+        default=1,
+        help="Videos to render at once with --pipeline",
+    )
+    parser.add_argument(
+        "--segment_workers",
+        type=int,
+        help="Processes to render each video's timeline in, as parallel segments "
+        "(defaults to RENDER_SEGMENT_WORKERS or 1)",
+    )
+    parser.add_argument(
+        "--render_mode",
+        choices=["python", "ffmpeg"],
+        help="Composite the captions onto the background in Python, or render only "
+        "the captions and let ffmpeg composite them (defaults to RENDER_MODE or python)",
+    )
+    parser.add_argument(
+        "--preset",
+        type=str,
+        help='x264 preset to encode the videos with, or "preview"/"final" for '
+        "ultrafast/slow (defaults to RENDER_PRESET or medium)",
+    )
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    # Imported here rather than at the top, as render workers are spawned processes
+    # that re-import this module and should only import the video generator
+    from reels import read_jobs, run_batch, run_pipelined
+
+    if args.jobs:
+        jobs = read_jobs(args.jobs)
+    elif args.subreddits:
+        jobs = [{"post_sub": post_sub} for post_sub in args.subreddits]
+    else:
+        post_sub = args.post_sub
+        if not post_sub:
+            post_sub = input("Enter subreddit: ")
+        jobs = [{"post_sub": post_sub}]
+
+    results_file = args.results
+    if results_file is None and len(jobs) > 1:
+        results_file = "batch_results.jsonl"
+
+    # Render settings that aren't given fall back to the video generator's defaults
+    render_options = {}
+    if args.segment_workers is not None:
+        render_options["workers"] = args.segment_workers
+    if args.render_mode is not None:
+        render_options["render_mode"] = args.render_mode
+    if args.preset is not None:
+        render_options["preset"] = args.preset
+
+    if args.pipeline:
+        run_pipelined(
+            jobs,
+            results_file,
+            render_workers=args.render_workers,
+            render_options=render_options,
+        )
+    else:
+        run_batch(jobs, results_file, render_options)
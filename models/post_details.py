@@ -1,9 +1,5 @@
-from pydantic import BaseModel
+from models.reddit_post import RedditPost
 
 
-class PostDetails(BaseModel):
-    post_title: str
-    post_content: str
-    subreddit: str
-    user: str
+class PostDetails(RedditPost):
     hashtags: str
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class RedditPost(BaseModel):
+    post_title: str
+    post_content: str
+    subreddit: str
+    user: str
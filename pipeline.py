@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Marks the end of a stage's input
+DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    A pipeline stage that applies function to every item, on `workers` threads.
+    CPU-bound stages should hand their work to a process pool from function.
+    """
+
+    name: str
+    function: Callable[[Any], Any]
+    workers: int = 1
+    busy_seconds: float = 0.0
+    processed: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class Pipeline:
+    """
+    Runs items through a sequence of stages connected by bounded queues, so different
+    items are in different stages at the same time: while one item is being rendered,
+    the next one can already be waiting on the network. When an item fails in a stage,
+    the remaining stages skip it and the error is reported with it.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 1):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(
+        self,
+        items: Iterable[Any],
+        on_result: Callable[[int, Any, Optional[BaseException]], None],
+    ) -> None:
+        """
+        Feeds items into the first stage and calls on_result(index, result, error) on
+        the calling thread for every item as it leaves the last stage. A BaseException
+        that isn't an Exception, like KeyboardInterrupt, is reported with its item and
+        raised again once every item is through.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        queues.append(queue.Queue())
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        def work(k: int) -> None:
+            stage = self.stages[k]
+            try:
+                while True:
+                    item = queues[k].get()
+                    if item is DONE:
+                        break
+                    index, value, error = item
+                    if error is None:
+                        start_time = time.time()
+                        try:
+                            value = stage.function(value)
+                        except BaseException as e:
+                            # Interrupts are reported with the item too, so it isn't
+                            # lost, and re-raised by run once the pipeline is drained
+                            error = e
+                        with stage.lock:
+                            stage.busy_seconds += time.time() - start_time
+                            stage.processed += 1
+                    queues[k + 1].put((index, value, error))
+            finally:
+                # The last worker of a stage to finish ends the next stage's input
+                with remaining_lock:
+                    remaining[k] -= 1
+                    last = remaining[k] == 0
+                if last:
+                    last_stage = k + 1 == len(self.stages)
+                    for _ in range(1 if last_stage else self.stages[k + 1].workers):
+                        queues[k + 1].put(DONE)
+
+        def feed() -> None:
+            for index, value in enumerate(items):
+                queues[0].put((index, value, None))
+            for _ in range(self.stages[0].workers):
+                queues[0].put(DONE)
+
+        threads = [threading.Thread(target=feed, daemon=True)]
+        for k, stage in enumerate(self.stages):
+            threads += [
+                threading.Thread(
+                    target=work, args=(k,), name=f"{stage.name}-{i}", daemon=True
+                )
+                for i in range(stage.workers)
+            ]
+        for thread in threads:
+            thread.start()
+
+        interrupt: Optional[BaseException] = None
+        while True:
+            item = queues[-1].get()
+            if item is DONE:
+                break
+            on_result(*item)
+            error = item[2]
+            if error is not None and not isinstance(error, Exception):
+                interrupt = interrupt or error
+
+        for thread in threads:
+            thread.join()
+        if interrupt is not None:
+            raise interrupt
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the number of items each stage processed and the time it spent on them.
+        """
+        return {
+            stage.name: {
+                "processed": stage.processed,
+                "busy_seconds": round(stage.busy_seconds, 2),
+            }
+            for stage in self.stages
+        }
@@ -1,5 +1,5 @@
 from crewai import Agent
-from models.post_details import PostDetails
+from models.instagram_hashtags import InstagramHashtags
 from textwrap import dedent
 
 
@@ -7,12 +7,12 @@ class InstagramSpecialistAgent:
     def __init__(self, llm):
         self.agent = Agent(
             role="Senior Instagram Content Specialist",
-            goal="Generate optimized Instagram hashtags for increasing views and engagement on a Reel using a given voice-over transcript.",
+            goal="Generate optimized Instagram hashtags for increasing views and engagement on a Reel using a given Reddit post that is read as its voice-over.",
             backstory=dedent("""\
                 As an Instagram expert, you specialize in identifying the most effective hashtags that help Reels go viral. 
                 You stay updated with the latest trends and use your knowledge to maximize the reach and interaction of the content you work on.
             """),
-            output_pydantic=PostDetails,
+            output_pydantic=InstagramHashtags,
             llm=llm,
         )
 
@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+from typing import List, Optional
+import os
+import time
+
+import numpy
+
+from reddit_video_generator_crew.seen_posts import SeenPostIndex
+from reddit_video_generator_crew.agents.reddit_tools import (
+    normalize_subreddit,
+    SearchCache,
+    with_retries,
+)
+
+# Listing the candidates are pulled from, and how many posts one request returns
+CANDIDATE_LISTING = os.environ.get("CANDIDATE_LISTING", "top")
+CANDIDATE_TIME_FILTER = os.environ.get("CANDIDATE_TIME_FILTER", "day")
+CANDIDATE_FETCH_LIMIT = int(os.environ.get("CANDIDATE_FETCH_LIMIT", 100))
+CANDIDATE_TOP_K = int(os.environ.get("CANDIDATE_TOP_K", 5))
+
+# Posts have to be short enough for a reel voiceover. Set CANDIDATE_MIN_WORDS to also
+# leave out posts too short to be a story
+MAX_WORDS = 200
+MIN_WORDS = int(os.environ.get("CANDIDATE_MIN_WORDS", 0))
+# Length the length score peaks at
+TARGET_WORDS = 150
+
+# Weights of the standardized features in a candidate's score
+SCORE_WEIGHTS = {
+    "score": 1.0,
+    "comment_ratio": 0.5,
+    "upvote_ratio": 0.5,
+    "length": 0.5,
+    "recency": 0.5,
+}
+# Hours it takes the recency feature to fall to 1/e
+RECENCY_HOURS = 24.0
+
+listing_cache = SearchCache()
+
+
+@dataclass
+class Candidate:
+    """
+    A text post that fits in a reel, with the fields used to rank it.
+    """
+
+    post_id: str
+    title: str
+    text: str
+    author: str
+    subreddit: str
+    score: int
+    num_comments: int
+    upvote_ratio: float
+    created_utc: float
+    url: str
+
+    @property
+    def word_count(self) -> int:
+        return len(self.text.split())
+
+
+def fetch_listing(
+    subreddit: str,
+    listing: str = CANDIDATE_LISTING,
+    time_filter: str = CANDIDATE_TIME_FILTER,
+    limit: int = CANDIDATE_FETCH_LIMIT,
+) -> List[Candidate]:
+    """
+    Pulls a subreddit's hot or top listing in one request and keeps the text posts that
+    fit in a reel. Listings are cached like searches.
+    """
+    subreddit = normalize_subreddit(subreddit)
+
+    def request(client) -> List[Candidate]:
+        posts = client.reddit_client.subreddit(subreddit)
+        if listing == "top":
+            submissions = posts.top(time_filter=time_filter, limit=limit)
+        else:
+            submissions = getattr(posts, listing)(limit=limit)
+
+        candidates = []
+        for submission in submissions:
+            if not submission.is_self or submission.stickied or submission.over_18:
+                continue
+            if submission.selftext in ("", "[removed]", "[deleted]"):
+                continue
+            candidate = Candidate(
+                post_id=submission.id,
+                title=submission.title,
+                text=submission.selftext,
+                author=submission.author.name if submission.author else "[deleted]",
+                subreddit=submission.subreddit.display_name,
+                score=submission.score,
+                num_comments=submission.num_comments,
+                upvote_ratio=submission.upvote_ratio,
+                created_utc=submission.created_utc,
+                url=f"https://www.reddit.com{submission.permalink}",
+            )
+            if MIN_WORDS <= candidate.word_count < MAX_WORDS:
+                candidates.append(candidate)
+        return candidates
+
+    key = ("listing", subreddit, listing, time_filter, limit)
+    return listing_cache.get_or_fetch(key, lambda: with_retries(request))
+
+
+def standardize(values: numpy.ndarray) -> numpy.ndarray:
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else numpy.zeros_like(values)
+
+
+def score_candidates(
+    candidates: List[Candidate], now: Optional[float] = None
+) -> numpy.ndarray:
+    """
+    Scores candidates by a weighted sum of their standardized log score, comments per
+    upvote, upvote ratio, closeness to the target length and recency.
+    """
+    if not candidates:
+        return numpy.zeros(0)
+    now = time.time() if now is None else now
+
+    score = numpy.array([c.score for c in candidates], dtype=float)
+    comments = numpy.array([c.num_comments for c in candidates], dtype=float)
+    words = numpy.array([c.word_count for c in candidates], dtype=float)
+    age_hours = (now - numpy.array([c.created_utc for c in candidates])) / 3600
+
+    features = {
+        "score": numpy.log1p(numpy.maximum(score, 0)),
+        "comment_ratio": numpy.log1p(comments / numpy.maximum(score, 1)),
+        "upvote_ratio": numpy.array([c.upvote_ratio for c in candidates], dtype=float),
+        "length": -numpy.abs(words - TARGET_WORDS) / TARGET_WORDS,
+        "recency": numpy.exp(-numpy.maximum(age_hours, 0) / RECENCY_HOURS),
+    }
+    return sum(
+        weight * standardize(features[name]) for name, weight in SCORE_WEIGHTS.items()
+    )
+
+
+def top_candidates(
+    subreddit: str,
+    k: int = CANDIDATE_TOP_K,
+    now: Optional[float] = None,
+    seen_posts: Optional[SeenPostIndex] = None,
+) -> List[Candidate]:
+    """
+    Returns the k best ranked candidates from the subreddit's listing, leaving out the
+    posts in seen_posts. Ties keep the listing's order, so the same listing always
+    ranks the same way.
+    """
+    candidates = fetch_listing(subreddit)
+    if seen_posts is not None:
+        candidates = [
+            c for c in candidates if seen_posts.find(c.title, c.text, c.post_id) is None
+        ]
+    scores = score_candidates(candidates, now)
+    order = numpy.argsort(-scores, kind="stable")[:k]
+    return [candidates[i] for i in order]
+
+
+def format_candidates(candidates: List[Candidate]) -> str:
+    """
+    Formats candidates as compact numbered entries for the post finder task.
+    """
+    if not candidates:
+        return "None"
+    entries = []
+    for i, candidate in enumerate(candidates, 1):
+        entries.append(
+            f"[{i}] r/{candidate.subreddit} by u/{candidate.author} | "
+            f"score {candidate.score}, {candidate.num_comments} comments, "
+            f"{candidate.word_count} words\n"
+            f"Title: {candidate.title}\n"
+            f"Text: {' '.join(candidate.text.split())}"
+        )
+    return "\n\n".join(entries)
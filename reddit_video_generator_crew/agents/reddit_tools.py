@@ -1,6 +1,181 @@
+from concurrent.futures import Future
 from crewai.tools import tool
 from langchain_community.utilities.reddit_search import RedditSearchAPIWrapper
+from prawcore.exceptions import ServerError, TooManyRequests
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import logging
 import os
+import threading
+import time
+
+# How long search results are served from memory, in seconds
+SEARCH_CACHE_TTL = float(os.environ.get("REDDIT_SEARCH_TTL", 900))
+MAX_RETRIES = int(os.environ.get("REDDIT_MAX_RETRIES", 3))
+RETRY_BACKOFF = 2.0
+
+
+class SearchCache:
+    """
+    In-memory TTL cache of Reddit request results. Concurrent lookups of a key that is
+    being fetched wait for that fetch instead of sending the same request again.
+    Failed fetches are not cached.
+    """
+
+    def __init__(self, ttl: float = SEARCH_CACHE_TTL):
+        self.ttl = ttl
+        self.entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self.pending: Dict[Hashable, Future] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            future = self.pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.pending[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as error:
+            with self.lock:
+                del self.pending[key]
+            future.set_exception(error)
+            raise
+
+        with self.lock:
+            now = time.monotonic()
+            self.entries = {
+                k: v for k, v in self.entries.items() if now - v[0] < self.ttl
+            }
+            self.entries[key] = (now, value)
+            del self.pending[key]
+        future.set_result(value)
+        return value
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+search_cache = SearchCache()
+reddit_client: Optional[RedditSearchAPIWrapper] = None
+# PRAW sessions aren't thread-safe, so requests on the shared client are serialized
+reddit_client_lock = threading.Lock()
+
+
+def get_reddit_client() -> RedditSearchAPIWrapper:
+    """
+    Returns the process-wide Reddit search client, authenticating on first use.
+    """
+    global reddit_client
+    with reddit_client_lock:
+        if reddit_client is None:
+            reddit_client = RedditSearchAPIWrapper(
+                reddit_client_id=os.environ["REDDIT_CLIENT_ID"],
+                reddit_client_secret=os.environ["REDDIT_CLIENT_SECRET"],
+                reddit_user_agent=os.environ["REDDIT_USER_AGENT"],
+            )
+        return reddit_client
+
+
+def normalize_subreddit(subreddit: Optional[str]) -> Optional[str]:
+    if not subreddit:
+        return None
+    subreddit = subreddit.strip().lower()
+    return subreddit[2:] if subreddit.startswith("r/") else subreddit
+
+
+def search_key(
+    query: str, subreddit: Optional[str], sort: str, time_filter: str, limit: int
+) -> Tuple[str, Optional[str], str, str, int]:
+    """
+    Normalizes search arguments that return the same results to the same cache key.
+    """
+    return (
+        " ".join(query.split()).lower(),
+        normalize_subreddit(subreddit),
+        sort.lower(),
+        time_filter.lower(),
+        int(limit),
+    )
+
+
+def with_retries(request: Callable[[RedditSearchAPIWrapper], Any]) -> Any:
+    """
+    Runs a request on the shared client, waiting out Reddit's rate limit and retrying
+    server errors with exponential backoff.
+    """
+    client = get_reddit_client()
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with reddit_client_lock:
+                return request(client)
+        except (TooManyRequests, ServerError) as error:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = RETRY_BACKOFF * 2**attempt
+            headers = getattr(getattr(error, "response", None), "headers", None) or {}
+            if headers.get("retry-after", "").isdigit():
+                delay = max(delay, float(headers["retry-after"]))
+            logging.warning(
+                f"Reddit request failed ({error}), retrying in {delay:.0f}s"
+            )
+            time.sleep(delay)
+
+
+def fetch_search(
+    query: str, subreddit: Optional[str], sort: str, time_filter: str, limit: int
+) -> str:
+    return with_retries(
+        lambda client: str(
+            client.run(
+                query=query,
+                subreddit=subreddit,
+                sort=sort,
+                time_filter=time_filter,
+                limit=limit,
+            )
+        )
+    )
+
+
+def search_reddit(
+    query: str,
+    subreddit: Optional[str] = None,
+    sort: str = "relevance",
+    time_filter: str = "all",
+    limit: int = 5,
+) -> str:
+    """
+    Searches Reddit, serving repeated searches from the shared cache.
+    """
+    key = search_key(query, subreddit, sort, time_filter, limit)
+    return search_cache.get_or_fetch(
+        key, lambda: fetch_search(query, subreddit, sort, time_filter, limit)
+    )
 
 
 @tool("Reddit Search Tool")
@@ -22,16 +197,4 @@ def reddit_search_tool(
     Returns:
         str: Search results as a string.
     """
-    api_wrapper = RedditSearchAPIWrapper(
-        reddit_client_id=os.environ["REDDIT_CLIENT_ID"],
-        reddit_client_secret=os.environ["REDDIT_CLIENT_SECRET"],
-        reddit_user_agent=os.environ["REDDIT_USER_AGENT"],
-    )
-    results = api_wrapper.run(
-        query=query,
-        subreddit=subreddit,
-        sort=sort,
-        time_filter=time_filter,
-        limit=limit,
-    )
-    return str(results)
+    return search_reddit(query, subreddit, sort, time_filter, limit)
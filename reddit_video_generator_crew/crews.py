@@ -0,0 +1,187 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import os
+
+from crewai import Crew
+from langchain_openai import AzureChatOpenAI
+
+from models.post_details import PostDetails
+from models.reddit_post import RedditPost
+from reddit_video_generator_crew.agents.copywriter import CopywriterAgent
+from reddit_video_generator_crew.agents.instagram_specialist import (
+    InstagramSpecialistAgent,
+)
+from reddit_video_generator_crew.agents.reddit_candidates import (
+    format_candidates,
+    top_candidates,
+)
+from reddit_video_generator_crew.agents.reddit_post_finder import RedditPostFinderAgent
+from reddit_video_generator_crew.agents.reddit_tools import reddit_search_tool
+from reddit_video_generator_crew.llm_cache import CachedLLM
+from reddit_video_generator_crew.seen_posts import (
+    DuplicatePostError,
+    get_seen_post_index,
+    normalize_text,
+    SeenPost,
+)
+from reddit_video_generator_crew.tasks.find_reddit_post import FindRedditPostTask
+from reddit_video_generator_crew.tasks.write_instagram_hashtags import (
+    WriteInstagramHashtags,
+)
+from reddit_video_generator_crew.tasks.write_voiceover_script import (
+    WriteVoiceoverScriptTask,
+)
+
+# How many times the post finder is run when it chooses a post that was already used
+FINDER_ATTEMPTS = 3
+
+
+@dataclass
+class Crews:
+    """
+    The crews that find a post and write its voiceover script and hashtags.
+    The voiceover script and hashtags both only need the chosen post, so their crews
+    run at the same time on executor.
+    """
+
+    post_finder: Crew
+    copywriter: Crew
+    hashtags: Crew
+    executor: ThreadPoolExecutor
+
+
+def build_crews() -> Crews:
+    """
+    Creates the LLM clients, agents, tasks and crews.
+    """
+    # Models, with their responses cached as set by LLM_CACHE_MODE
+    gpt4o_mini = CachedLLM(
+        AzureChatOpenAI(
+            model="azure/gpt-4o-mini",
+            api_version="2023-03-15-preview",
+            api_key=os.environ["AZURE_OPENAI_GPT4O_API_KEY"],
+        )
+    )
+
+    gpt4o = CachedLLM(
+        AzureChatOpenAI(
+            model="azure/gpt-4o",
+            api_version="2024-05-03-preview",
+            api_key=os.environ["AZURE_OPENAI_GPT4O_API_KEY"],
+        )
+    )
+
+    reddit_post_finder = RedditPostFinderAgent([reddit_search_tool], gpt4o).get_agent()
+    copywriter = CopywriterAgent(gpt4o_mini).get_agent()
+    instagram_specialist = InstagramSpecialistAgent(gpt4o_mini).get_agent()
+
+    find_reddit_post_task = FindRedditPostTask(reddit_post_finder).get_task()
+    write_voiceover_transcript = WriteVoiceoverScriptTask(
+        context=None, agent=copywriter
+    ).get_task()
+    write_instagram_hashtags = WriteInstagramHashtags(
+        None, instagram_specialist
+    ).get_task()
+
+    return Crews(
+        post_finder=Crew(
+            agents=[reddit_post_finder],
+            tasks=[find_reddit_post_task],
+            verbose=True,
+        ),
+        copywriter=Crew(
+            agents=[copywriter],
+            tasks=[write_voiceover_transcript],
+            verbose=True,
+        ),
+        hashtags=Crew(
+            agents=[instagram_specialist],
+            tasks=[write_instagram_hashtags],
+            verbose=True,
+        ),
+        executor=ThreadPoolExecutor(max_workers=2),
+    )
+
+
+crews: Optional[Crews] = None
+
+
+def get_crews() -> Crews:
+    """
+    Returns the shared crews, building them on first use.
+    """
+    global crews
+    if crews is None:
+        crews = build_crews()
+    return crews
+
+
+def format_titles(titles: List[str]) -> str:
+    return "\n".join(f"- {title}" for title in titles) or "None"
+
+
+def format_post(post: RedditPost) -> str:
+    return (
+        f"Title: {post.post_title}\n"
+        f"Subreddit: {post.subreddit}\n"
+        f"User: {post.user}\n"
+        f"Content: {post.post_content}"
+    )
+
+
+def find_post(post_sub: str) -> Tuple[PostDetails, SeenPost]:
+    """
+    Runs the crews on a subreddit and returns the chosen post's details, with its claim
+    in the seen-post index. Raises DuplicatePostError if the post finder keeps choosing
+    posts that have already been made into reels.
+    """
+    seen_posts = get_seen_post_index()
+    try:
+        candidates = top_candidates(post_sub, seen_posts=seen_posts)
+    except Exception as error:
+        # The post finder searches the subreddit itself when there are no candidates
+        print(f"Failed to prefetch candidate posts: {error}")
+        candidates = []
+
+    crews = get_crews()
+    # The seen posts are part of the prompt, so cached finder responses that chose
+    # one of them miss instead of choosing it again
+    excluded = seen_posts.titles(post_sub)
+    for attempt in range(FINDER_ATTEMPTS):
+        print("Kicking off crew...")
+        found = crews.post_finder.kickoff(
+            inputs={
+                "post_sub": post_sub,
+                "candidates": format_candidates(candidates),
+                "seen_posts": format_titles(excluded),
+            }
+        ).pydantic
+
+        title = normalize_text(found.post_title)
+        post_id = next(
+            (c.post_id for c in candidates if normalize_text(c.title) == title), None
+        )
+        try:
+            claim = seen_posts.claim(
+                found.post_title, found.post_content, found.subreddit, post_id
+            )
+            break
+        except DuplicatePostError:
+            if attempt == FINDER_ATTEMPTS - 1:
+                raise
+            print(f"'{found.post_title}' was already used, finding another post...")
+            excluded.insert(0, found.post_title)
+
+    try:
+        inputs = {"reddit_post": format_post(found)}
+        script = crews.executor.submit(crews.copywriter.kickoff, inputs=inputs)
+        hashtags = crews.executor.submit(crews.hashtags.kickoff, inputs=inputs)
+        post = PostDetails(
+            **script.result().pydantic.model_dump(),
+            hashtags=hashtags.result().pydantic.hashtags,
+        )
+    except BaseException:
+        seen_posts.release(claim)
+        raise
+    return post, claim
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Union
+
+from crewai import BaseLLM
+from crewai.utilities.llm_utils import create_llm
+
+OUT_DIR: str = os.path.join(os.path.dirname(__file__), "out")
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", os.path.join(OUT_DIR, "llm_cache"))
+# "cache" serves stored responses and stores new ones, "record" always calls the model
+# and stores its responses, "replay" only serves stored responses, "off" always calls
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "cache")
+LLM_CACHE_MODES = ("cache", "record", "replay", "off")
+
+# Call arguments that don't change the response
+IGNORED_ARGUMENTS = ("callbacks", "available_functions", "from_task", "from_agent")
+
+
+class ReplayMissError(Exception):
+    """
+    Raised in replay mode for a call that has no recorded response.
+    """
+
+
+def normalize_messages(
+    messages: Union[str, List[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """
+    Collapses whitespace in message contents, so prompts that only differ in
+    indentation or line breaks share a key.
+    """
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    normalized = []
+    for message in messages:
+        message = dict(message)
+        if isinstance(message.get("content"), str):
+            message["content"] = " ".join(message["content"].split())
+        normalized.append(message)
+    return normalized
+
+
+def describe(value: Any) -> Any:
+    """
+    Returns a JSON encodable description of a call argument, such as the schema of a
+    response model class.
+    """
+    if isinstance(value, type) and hasattr(value, "model_json_schema"):
+        return value.model_json_schema()
+    return value
+
+
+class LLMCache:
+    """
+    Local store of LLM responses, one JSON file per call named by the SHA-256 of the
+    model, normalized messages and the other call arguments. The prompts of later agent
+    turns contain the earlier tool results, so they are part of the key too.
+    Recorded files can be committed and replayed offline with mode="replay".
+    """
+
+    def __init__(self, cache_dir: str = LLM_CACHE_DIR, mode: str = LLM_CACHE_MODE):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(
+                f"Unknown LLM cache mode {mode}, use one of {LLM_CACHE_MODES}"
+            )
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, request: Dict[str, Any]) -> str:
+        data = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self.path(key), "r", encoding="utf-8") as f:
+                return json.load(f)["response"]
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, request: Dict[str, Any], response: str) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"request": request, "response": response},
+                f,
+                ensure_ascii=False,
+                indent=1,
+                default=str,
+            )
+        os.replace(temp_path, path)
+
+    def record_lookup(self, hit: bool) -> None:
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+llm_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> LLMCache:
+    """
+    Returns the shared LLM response cache, configured from the environment.
+    """
+    global llm_cache
+    if llm_cache is None:
+        llm_cache = LLMCache()
+    return llm_cache
+
+
+class CachedLLM(BaseLLM):
+    """
+    Wraps an agent's LLM, such as an AzureChatOpenAI instance, and serves its
+    responses from an LLMCache. Calls that return something other than text,
+    like native tool calls, are passed through uncached.
+    """
+
+    def __init__(self, llm: Any, cache: Optional[LLMCache] = None):
+        self.llm = create_llm(llm)
+        self.cache = cache or get_llm_cache()
+        super().__init__(model=self.llm.model, temperature=self.llm.temperature)
+
+    # The agent adds its stop words to its LLM, which have to reach the wrapped one
+    @property
+    def stop(self) -> List[str]:
+        return self.llm.stop
+
+    @stop.setter
+    def stop(self, value: Optional[List[str]]) -> None:
+        if value is not None and "llm" in self.__dict__:
+            self.llm.stop = value
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, Any]]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        if self.cache.mode == "off":
+            return self.llm.call(messages, tools=tools, **kwargs)
+
+        request = {
+            "model": self.llm.model,
+            "temperature": self.llm.temperature,
+            "stop": sorted(self.llm.stop or []),
+            "messages": normalize_messages(messages),
+            "tools": tools,
+            **{
+                name: describe(value)
+                for name, value in kwargs.items()
+                if name not in IGNORED_ARGUMENTS and value is not None
+            },
+        }
+        key = self.cache.key(request)
+
+        if self.cache.mode != "record":
+            response = self.cache.get(key)
+            self.cache.record_lookup(response is not None)
+            if response is not None:
+                return response
+            if self.cache.mode == "replay":
+                raise ReplayMissError(
+                    f"No recorded {self.llm.model} response for key {key}"
+                )
+
+        response = self.llm.call(messages, tools=tools, **kwargs)
+        if isinstance(response, str):
+            self.cache.put(key, request, response)
+        return response
+
+    def supports_function_calling(self) -> bool:
+        return self.llm.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.llm.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.llm.get_context_window_size()
+
+    def __getattr__(self, name: str) -> Any:
+        # Anything else the crew reads from its LLM comes from the wrapped one
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
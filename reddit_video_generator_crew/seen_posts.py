@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import numpy
+
+OUT_DIR: str = os.path.join(os.path.dirname(__file__), "out")
+SEEN_POSTS_FILE = os.environ.get(
+    "SEEN_POSTS_FILE", os.path.join(OUT_DIR, "seen_posts.jsonl")
+)
+# Largest number of differing SimHash bits for two posts to count as the same story
+SIMHASH_DISTANCE = int(os.environ.get("SIMHASH_DISTANCE", 12))
+# Words per shingle hashed into the SimHash
+SHINGLE_WORDS = 2
+
+
+class DuplicatePostError(Exception):
+    """
+    Raised when the chosen post has already been made into a reel.
+    """
+
+
+def normalize_text(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def normalize_subreddit(subreddit: str) -> str:
+    subreddit = subreddit.strip().lower()
+    return subreddit[2:] if subreddit.startswith("r/") else subreddit
+
+
+def fingerprint(title: str, text: str) -> str:
+    """
+    Returns the SHA-256 of the post's title and text, ignoring case, punctuation
+    and whitespace.
+    """
+    words = normalize_text(title) + ["\n"] + normalize_text(text)
+    return hashlib.sha256(" ".join(words).encode("utf-8")).hexdigest()
+
+
+def simhash(title: str, text: str) -> int:
+    """
+    Returns the 64-bit SimHash of the post's word shingles. Posts with small edits,
+    like a copywriter's cleanup, differ in only a few bits.
+    """
+    words = normalize_text(f"{title} {text}")
+    shingles = [
+        " ".join(words[i : i + SHINGLE_WORDS])
+        for i in range(max(1, len(words) - SHINGLE_WORDS + 1))
+    ]
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+        for shingle in shingles
+    )
+    bits = numpy.unpackbits(numpy.frombuffer(digests, dtype=numpy.uint8))
+    votes = (bits.reshape(len(shingles), 64).astype(numpy.int32) * 2 - 1).sum(axis=0)
+    return int.from_bytes(numpy.packbits(votes > 0).tobytes(), "big")
+
+
+@dataclass
+class SeenPost:
+    """
+    A post that has been made into a reel.
+    """
+
+    post_id: Optional[str]
+    title: str
+    subreddit: str
+    fingerprint: str
+    simhash: int
+    seen_at: float
+
+
+class SeenPostIndex:
+    """
+    Persistent index of the posts that have already been made into reels, so later runs
+    don't pick them again. Posts are appended to a JSON lines file and looked up in
+    memory by post id, by exact fingerprint, and by SimHash distance for reworded
+    reposts and cleaned-up copies. Posts claimed by jobs that are still running count
+    as seen too, but are only written to the file once their reel is done.
+    """
+
+    def __init__(self, index_file: str = SEEN_POSTS_FILE):
+        self.index_file = index_file
+        self.posts: List[SeenPost] = []
+        self.ids: Dict[str, SeenPost] = {}
+        self.fingerprints: Dict[str, SeenPost] = {}
+        self.claimed: Dict[str, SeenPost] = {}
+        self.lock = threading.RLock()
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.index_file):
+            return
+        with open(self.index_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self.remember(SeenPost(**json.loads(line)))
+
+    def remember(self, post: SeenPost) -> None:
+        self.posts.append(post)
+        if post.post_id:
+            self.ids[post.post_id] = post
+        self.fingerprints[post.fingerprint] = post
+
+    def find(
+        self, title: str, text: str, post_id: Optional[str] = None
+    ) -> Optional[SeenPost]:
+        """
+        Returns the seen or claimed post that matches the given one, if any.
+        """
+        key = fingerprint(title, text)
+        hash_value = simhash(title, text)
+        with self.lock:
+            match = self.ids.get(post_id) if post_id else None
+            match = match or self.fingerprints.get(key) or self.claimed.get(key)
+            if match is not None:
+                return match
+            for post in self.posts + list(self.claimed.values()):
+                if post_id is not None and post.post_id == post_id:
+                    return post
+                if (post.simhash ^ hash_value).bit_count() <= SIMHASH_DISTANCE:
+                    return post
+        return None
+
+    def titles(self, subreddit: str, limit: int = 20) -> List[str]:
+        """
+        Returns the titles of the most recently seen or claimed posts from a subreddit.
+        """
+        subreddit = normalize_subreddit(subreddit)
+        with self.lock:
+            posts = self.posts + list(self.claimed.values())
+            titles = [
+                post.title
+                for post in sorted(posts, key=lambda post: post.seen_at, reverse=True)
+                if normalize_subreddit(post.subreddit) == subreddit
+            ]
+        return titles[:limit]
+
+    def claim(
+        self, title: str, text: str, subreddit: str, post_id: Optional[str] = None
+    ) -> SeenPost:
+        """
+        Marks a post as taken by a running job. Raises DuplicatePostError if it has
+        already been seen or claimed.
+        """
+        with self.lock:
+            duplicate = self.find(title, text, post_id)
+            if duplicate is not None:
+                raise DuplicatePostError(
+                    f"'{title}' was already made into a reel from "
+                    f"r/{duplicate.subreddit}: '{duplicate.title}'"
+                )
+            post = SeenPost(
+                post_id=post_id,
+                title=title,
+                subreddit=subreddit,
+                fingerprint=fingerprint(title, text),
+                simhash=simhash(title, text),
+                seen_at=time.time(),
+            )
+            self.claimed[post.fingerprint] = post
+            return post
+
+    def commit(self, post: SeenPost) -> None:
+        """
+        Records a claimed post whose reel is done.
+        """
+        with self.lock:
+            self.claimed.pop(post.fingerprint, None)
+            self.remember(post)
+            os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+            with open(self.index_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(post)) + "\n")
+
+    def release(self, post: SeenPost) -> None:
+        """
+        Drops the claim of a job that failed, so the post can be picked again.
+        """
+        with self.lock:
+            self.claimed.pop(post.fingerprint, None)
+
+
+seen_post_index: Optional[SeenPostIndex] = None
+
+
+def get_seen_post_index() -> SeenPostIndex:
+    """
+    Returns the shared seen-post index, loading it on first use.
+    """
+    global seen_post_index
+    if seen_post_index is None:
+        seen_post_index = SeenPostIndex()
+    return seen_post_index
@@ -1,5 +1,6 @@
 from crewai import Task
 from textwrap import dedent
+from models.reddit_post import RedditPost
 
 
 class FindRedditPostTask:
@@ -7,10 +8,18 @@ class FindRedditPostTask:
         self.task = Task(
             description=dedent(
                 """\
-            Search the {post_sub} subreddit to find today's 5 popular and engaging posts which
-            have the potential to become viral Instagram Reels voiceover videos. Focus on stories or other compelling content
-            that can be read as a voiceover. Then choose one of those 5 posts, ensuring the post selection is based on its potential
-            to get the highest views and interactions according to Instagram's algorithm."""
+            Choose one post from the candidates below, which are today's most popular text posts in the {post_sub} subreddit
+            that are less than 200 words, ranked by engagement. Choose the post with the potential to become a viral Instagram
+            Reels voiceover video, based on its potential to get the highest views and interactions according to Instagram's
+            algorithm. Focus on stories or other compelling content that can be read as a voiceover.
+            If no candidates are listed, search the {post_sub} subreddit to find today's 5 popular and engaging posts instead
+            and choose one of those.
+
+            Candidates:
+            {candidates}
+
+            Do not choose any of these posts, which have already been made into reels:
+            {seen_posts}"""
             ),
             expected_output=dedent(
                 """\
@@ -18,6 +27,7 @@ class FindRedditPostTask:
             The output should contain the post title, full post content, the original poster's username, and the name of the subreddit."""
             ),
             agent=agent,
+            output_pydantic=RedditPost,
         )
 
     def get_task(self):
@@ -1,6 +1,6 @@
 from crewai import Task
 from textwrap import dedent
-from models.post_details import PostDetails
+from models.instagram_hashtags import InstagramHashtags
 
 
 class WriteInstagramHashtags:
@@ -8,20 +8,22 @@ class WriteInstagramHashtags:
         self.task = Task(
             description=dedent(
                 """\
-                Using the provided voice-over transcript, which is derived from a cleaned-up Reddit post, generate a set of 
+                Using the provided Reddit post, which will be read as the voice-over of an Instagram Reel, generate a set of 
                 optimized hashtags specifically tailored to enhance the Instagram Reel's visibility and engagement. Your goal 
                 is to ensure the content reaches as many viewers as possible.
+
+                Reddit post:
+                {reddit_post}
                 """
             ),
             expected_output=dedent(
                 """\
-                A Reddit post with the cleaned up content, including the post title,  subreddit name(without the /r prefix) 
-                and the original poster's username, and a comprehensive list of 10-15 optimized Instagram hashtags.
+                A comprehensive list of 10-15 optimized Instagram hashtags.
                 """
             ),
             context=context,
             agent=agent,
-            output_pydantic=PostDetails,
+            output_pydantic=InstagramHashtags,
         )
 
     def get_task(self):
@@ -1,5 +1,6 @@
 from crewai import Task
 from textwrap import dedent
+from models.reddit_post import RedditPost
 
 
 class WriteVoiceoverScriptTask:
@@ -9,7 +10,10 @@ class WriteVoiceoverScriptTask:
                 """\
             Using the given Reddit post, clean up the content to create a Instagram Reels voiceover script. Content will be the transcript.
             Replace Reddit-specific acronyms (e.g., 'TIFU') with their full words. Remove any added details, like edits, that were not part of the initial post to
-            make the script concise, without adding or removing any meaningful information. Do not remove any parts of the initial original post."""
+            make the script concise, without adding or removing any meaningful information. Do not remove any parts of the initial original post.
+
+            Reddit post:
+            {reddit_post}"""
             ),
             expected_output=dedent(
                 """\
@@ -18,6 +22,7 @@ class WriteVoiceoverScriptTask:
             ),
             context=context,
             agent=agent,
+            output_pydantic=RedditPost,
         )
 
     def get_task(self):
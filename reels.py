@@ -0,0 +1,190 @@
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from image_generator.image_generator import ImageGenerator
+from models.post_details import PostDetails
+from pipeline import Pipeline, Stage
+from reddit_video_generator_crew.crews import find_post
+from reddit_video_generator_crew.llm_cache import get_llm_cache
+from reddit_video_generator_crew.seen_posts import get_seen_post_index
+from video_generator import video_generator
+
+
+def post_record(post: PostDetails) -> Dict[str, Any]:
+    return {
+        "post_title": post.post_title,
+        "user": post.user,
+        "subreddit": post.subreddit,
+        "hashtags": post.hashtags,
+    }
+
+
+def generate_reel(
+    post_sub: str,
+    image_generator: ImageGenerator,
+    render_options: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Finds a post in the subreddit and turns it into a reel, passing render_options on to
+    video_generator.generate_video. Returns the post details and the path of the video.
+    """
+    post, claim = find_post(post_sub)
+    seen_posts = get_seen_post_index()
+    try:
+        print("Idea is ready, generating title image...")
+        title_image = image_generator.render_reddit_title_image(
+            post.post_title,
+            post.user,
+            post.subreddit,
+        )
+
+        print("Image is generated, generating video...")
+        video_file = video_generator.generate_video(
+            title_image,
+            post.post_content,
+            post.post_title,
+            **(render_options or {}),
+        )
+    except BaseException:
+        seen_posts.release(claim)
+        raise
+    seen_posts.commit(claim)
+
+    return {**post_record(post), "video_file": video_file}
+
+
+def read_jobs(jobs_file: str) -> List[Dict[str, Any]]:
+    """
+    Reads a JSONL job file with one {"post_sub": ...} object per line, optionally with an "id".
+    """
+    with open(jobs_file, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_record(results_file: Optional[str], record: Dict[str, Any]) -> None:
+    if results_file is not None:
+        with open(results_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def run_batch(
+    jobs: List[Dict[str, Any]],
+    results_file: Optional[str] = None,
+    render_options: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Generates one reel per job in this process, so the LLM clients, crew, browser pool,
+    render caches and background index stay warm across jobs. A failed job doesn't stop
+    the batch, but a single job's error is raised. If results_file is given, a JSON record
+    with each job's outcome is appended to it as soon as the job finishes.
+    """
+    image_generator = ImageGenerator()
+    try:
+        for i, job in enumerate(jobs):
+            print(f"Job {i + 1}/{len(jobs)}: r/{job['post_sub']}")
+            record = {"id": job.get("id", i), "post_sub": job["post_sub"]}
+            start_time = time.time()
+            try:
+                record.update(
+                    generate_reel(job["post_sub"], image_generator, render_options)
+                )
+                record["status"] = "ok"
+            except Exception as error:
+                if len(jobs) == 1:
+                    raise
+                record["status"] = "error"
+                record["error"] = f"{type(error).__name__}: {error}"
+                print(f"Job {i + 1} failed: {record['error']}")
+            record["seconds"] = round(time.time() - start_time, 2)
+            write_record(results_file, record)
+    finally:
+        image_generator.quit_image_generator()
+    print(f"LLM cache: {get_llm_cache().stats()}")
+
+
+def run_pipelined(
+    jobs: List[Dict[str, Any]],
+    results_file: Optional[str] = None,
+    speech_workers: int = 2,
+    render_workers: int = 1,
+    render_options: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Generates one reel per job like run_batch, but overlaps the jobs in a staged pipeline:
+    the crew, speech synthesis and alignment, and title image stages run on threads, and
+    the render stage in a process pool, so one job's LLM and TTS calls run while another
+    job is being encoded. Records are written in the order jobs finish.
+    """
+    image_generator = ImageGenerator()
+    # Spawned rather than forked, as the pipeline's threads are already running
+    render_pool = ProcessPoolExecutor(
+        max_workers=render_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+    seen_posts = get_seen_post_index()
+
+    def find_stage(job: Dict[str, Any]) -> Dict[str, Any]:
+        start_time = time.time()
+        post, claim = find_post(job["post_sub"])
+        return {"start_time": start_time, "post": post, "claim": claim}
+
+    def speech_stage(item: Dict[str, Any]) -> Dict[str, Any]:
+        post = item["post"]
+        item["video_job"] = video_generator.prepare_video(
+            post.post_content, post.post_title
+        )
+        return item
+
+    def title_stage(item: Dict[str, Any]) -> Dict[str, Any]:
+        post = item["post"]
+        item["title_image"] = image_generator.render_reddit_title_image(
+            post.post_title, post.user, post.subreddit
+        )
+        return item
+
+    def render_stage(item: Dict[str, Any]) -> Dict[str, Any]:
+        future = render_pool.submit(
+            video_generator.render_video,
+            item.pop("video_job"),
+            item.pop("title_image"),
+            **(render_options or {}),
+        )
+        item["video_file"] = future.result()
+        return item
+
+    pipeline = Pipeline(
+        [
+            Stage("crew", find_stage),
+            Stage("speech", speech_stage, workers=speech_workers),
+            Stage("title", title_stage),
+            Stage("render", render_stage, workers=render_workers),
+        ]
+    )
+
+    def on_result(index: int, item: Any, error: Optional[BaseException]) -> None:
+        job = jobs[index]
+        record = {"id": job.get("id", index), "post_sub": job["post_sub"]}
+        if error is None:
+            seen_posts.commit(item["claim"])
+            record.update(post_record(item["post"]), video_file=item["video_file"])
+            record["status"] = "ok"
+        else:
+            if "claim" in item:
+                seen_posts.release(item["claim"])
+            record["status"] = "error"
+            record["error"] = f"{type(error).__name__}: {error}"
+            print(f"Job {index + 1} failed: {record['error']}")
+        if "start_time" in item:
+            record["seconds"] = round(time.time() - item["start_time"], 2)
+        write_record(results_file, record)
+
+    try:
+        pipeline.run(jobs, on_result)
+    finally:
+        render_pool.shutdown()
+        image_generator.quit_image_generator()
+    print(f"Pipeline stages: {pipeline.stats()}")
+    print(f"LLM cache: {get_llm_cache().stats()}")
@@ -0,0 +1,153 @@
+"""
+Tests for the WebDriver pool's lending, replacement of failed drivers and closing,
+run with fake drivers instead of browsers.
+"""
+
+import threading
+import time
+import unittest
+
+try:
+    from selenium.common.exceptions import WebDriverException
+
+    from image_generator.driver_pool import DriverPool
+except ImportError:
+    DriverPool = None
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeFactory:
+    """
+    Launches fake drivers, failing the launches listed in fail_launches.
+    """
+
+    def __init__(self, fail_launches=()):
+        self.fail_launches = set(fail_launches)
+        self.launched = []
+        self.launches = 0
+
+    def __call__(self) -> FakeDriver:
+        self.launches += 1
+        if self.launches in self.fail_launches:
+            raise WebDriverException("Failed to launch")
+        driver = FakeDriver()
+        self.launched.append(driver)
+        return driver
+
+
+@unittest.skipIf(DriverPool is None, "Selenium isn't installed")
+class DriverPoolTest(unittest.TestCase):
+    def wait_in_thread(self, pool: DriverPool, timeout: float = 5.0):
+        """
+        Starts a thread that acquires a driver, and returns it with its result list.
+        """
+        results = []
+
+        def wait():
+            try:
+                with pool.acquire(timeout) as driver:
+                    results.append(driver)
+            except Exception as error:
+                results.append(error)
+
+        thread = threading.Thread(target=wait)
+        thread.start()
+        time.sleep(0.1)
+        return thread, results
+
+    def test_reuses_idle_drivers(self):
+        factory = FakeFactory()
+        pool = DriverPool(1, factory)
+        with pool.acquire() as first:
+            pass
+        with pool.acquire() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(factory.launches, 1)
+
+    def test_waiter_replaces_a_failed_driver(self):
+        factory = FakeFactory()
+        pool = DriverPool(1, factory)
+        with self.assertRaises(WebDriverException):
+            with pool.acquire() as broken:
+                thread, results = self.wait_in_thread(pool)
+                raise WebDriverException("Driver crashed")
+        thread.join(5)
+
+        self.assertTrue(broken.quit_called)
+        self.assertEqual(len(results), 1)
+        self.assertIsInstance(results[0], FakeDriver)
+        self.assertIsNot(results[0], broken)
+
+    def test_waiter_retries_a_failed_launch(self):
+        factory = FakeFactory(fail_launches={2})
+        pool = DriverPool(2, factory)
+        with pool.acquire():
+            with self.assertRaises(WebDriverException):
+                with pool.acquire():
+                    pass
+            with pool.acquire() as driver:
+                self.assertIs(driver, factory.launched[1])
+
+    def test_waiter_is_woken_by_a_freed_launch_slot(self):
+        launching = threading.Event()
+        fail = threading.Event()
+
+        def factory():
+            launching.set()
+            fail.wait(5)
+            raise WebDriverException("Failed to launch")
+
+        pool = DriverPool(1, factory)
+        failed = []
+
+        def launch():
+            try:
+                pool.take(None)
+            except WebDriverException:
+                failed.append(True)
+
+        launcher = threading.Thread(target=launch)
+        launcher.start()
+        launching.wait(5)
+        pool.factory = FakeFactory()
+        thread, results = self.wait_in_thread(pool)
+        fail.set()
+        launcher.join(5)
+        thread.join(5)
+
+        self.assertEqual(failed, [True])
+        self.assertEqual(len(results), 1)
+        self.assertIsInstance(results[0], FakeDriver)
+
+    def test_times_out_when_all_drivers_are_busy(self):
+        pool = DriverPool(1, FakeFactory())
+        with pool.acquire():
+            with self.assertRaises(TimeoutError):
+                with pool.acquire(timeout=0.05):
+                    pass
+
+    def test_close_quits_idle_drivers_and_wakes_waiters(self):
+        factory = FakeFactory()
+        pool = DriverPool(1, factory)
+        with pool.acquire() as driver:
+            thread, results = self.wait_in_thread(pool)
+            pool.close()
+            thread.join(5)
+        self.assertIsInstance(results[0], RuntimeError)
+        self.assertTrue(driver.quit_called)
+        self.assertEqual(pool.drivers, [])
+        with self.assertRaises(RuntimeError):
+            with pool.acquire():
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
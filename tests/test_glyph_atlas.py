@@ -0,0 +1,64 @@
+"""
+Checks that glyphs rasterized by GlyphAtlas keep all of their ink, including accents
+that reach above the font's ascent.
+"""
+
+import glob
+import os
+import unittest
+
+import numpy
+from PIL import Image, ImageDraw, ImageFont
+
+from video_generator.glyph_atlas import get_atlas
+
+FONTS_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "video_generator", "assets", "fonts"
+)
+FONTS = sorted(glob.glob(os.path.join(FONTS_DIR, "*.ttf")))
+FONTSIZE = 100
+STROKE_WIDTH = 3
+ACCENTED = "ÉÄéñÅÖçÿ"
+
+
+def unclipped_ink(font: str, text: str, stroke_color) -> int:
+    """
+    Returns the total alpha of the text drawn with Pillow on a canvas with plenty of
+    room around it.
+    """
+    pil_font = ImageFont.truetype(font, FONTSIZE)
+    size = FONTSIZE * (len(text) + 4)
+    image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    ImageDraw.Draw(image).text(
+        (FONTSIZE * 2, FONTSIZE * 2),
+        text,
+        font=pil_font,
+        fill="white",
+        stroke_width=STROKE_WIDTH if stroke_color else 0,
+        stroke_fill=stroke_color,
+    )
+    return int(numpy.asarray(image)[:, :, 3].astype(numpy.int64).sum())
+
+
+class GlyphAtlasTest(unittest.TestCase):
+    def test_accented_glyphs_are_not_clipped(self):
+        for font in FONTS:
+            atlas = get_atlas(font, FONTSIZE, STROKE_WIDTH)
+            for stroke_color in (None, "black"):
+                for char in ACCENTED:
+                    name = os.path.basename(font)
+                    with self.subTest(font=name, stroked=bool(stroke_color), char=char):
+                        rendered = atlas.render_line([(char, "white")], stroke_color)
+                        ink = int(rendered[:, :, 3].astype(numpy.int64).sum())
+                        self.assertEqual(ink, unclipped_ink(font, char, stroke_color))
+
+    def test_line_regions_share_the_line_height(self):
+        atlas = get_atlas(FONTS[0], FONTSIZE, STROKE_WIDTH)
+        chars = [(char, "white") for char in "Et voilà Émile"]
+        line = atlas.render_line(chars, "black")
+        _, region = atlas.render_region(chars, 0, 2, "black")
+        self.assertEqual(region.shape[0], line.shape[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
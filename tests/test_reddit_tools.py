@@ -0,0 +1,128 @@
+"""
+Tests for the shared Reddit search client's cache, request coalescing and retries,
+run against a recorded search response instead of the Reddit API.
+"""
+
+import json
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+try:
+    from prawcore.exceptions import TooManyRequests
+
+    from reddit_video_generator_crew.agents import reddit_tools
+except ImportError:
+    reddit_tools = None
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "reddit_search.json")
+
+
+class RecordedClient:
+    """
+    Stands in for RedditSearchAPIWrapper, answering every search with the recorded
+    response and counting the requests.
+    """
+
+    def __init__(self, response: str, delay: float = 0.0):
+        self.response = response
+        self.delay = delay
+        self.requests = []
+
+    def run(self, **kwargs) -> str:
+        self.requests.append(kwargs)
+        time.sleep(self.delay)
+        return self.response
+
+
+@unittest.skipIf(reddit_tools is None, "The Reddit dependencies aren't installed")
+class RedditToolsTest(unittest.TestCase):
+    def setUp(self):
+        with open(FIXTURE, "r", encoding="utf-8") as f:
+            self.recording = json.load(f)
+        self.client = RecordedClient(self.recording["response"])
+        patches = [
+            mock.patch.object(
+                reddit_tools, "get_reddit_client", return_value=self.client
+            ),
+            mock.patch.object(reddit_tools, "search_cache", reddit_tools.SearchCache()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def search(self, **overrides) -> str:
+        request = {**self.recording["request"], **overrides}
+        return reddit_tools.search_reddit(**request)
+
+    def test_repeated_search_is_served_from_cache(self):
+        self.assertEqual(self.search(), self.recording["response"])
+        self.assertEqual(self.search(), self.recording["response"])
+        self.assertEqual(len(self.client.requests), 1)
+        self.assertEqual(reddit_tools.search_cache.stats()["hits"], 1)
+
+    def test_cached_search_expires_after_ttl(self):
+        reddit_tools.search_cache.ttl = 0.05
+        self.search()
+        time.sleep(0.1)
+        self.search()
+        self.assertEqual(len(self.client.requests), 2)
+
+    def test_equivalent_searches_share_a_key(self):
+        self.search(query="Scary  Story ", subreddit="r/Paranormal")
+        self.search(query="scary story", subreddit="paranormal")
+        self.assertEqual(len(self.client.requests), 1)
+        self.assertEqual(
+            reddit_tools.search_key("Scary  Story", "r/Foo", "Top", "ALL", 5),
+            reddit_tools.search_key("scary story", " foo", "top", "all", 5),
+        )
+
+    def test_concurrent_searches_are_coalesced(self):
+        cache = reddit_tools.SearchCache()
+        release = threading.Event()
+        fetches = []
+
+        def fetch():
+            fetches.append(1)
+            release.wait(5)
+            return self.recording["response"]
+
+        results = []
+
+        def search():
+            results.append(cache.get_or_fetch("k", fetch))
+
+        threads = [threading.Thread(target=search) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while cache.stats()["coalesced"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(fetches), 1)
+        self.assertEqual(cache.stats()["coalesced"], 1)
+        self.assertEqual(results, [self.recording["response"]] * 2)
+
+    def test_failed_fetch_is_not_cached(self):
+        cache = reddit_tools.SearchCache()
+        with self.assertRaises(RuntimeError):
+            cache.get_or_fetch("k", mock.Mock(side_effect=RuntimeError("down")))
+        self.assertEqual(cache.get_or_fetch("k", lambda: "results"), "results")
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_retries_wait_for_retry_after(self):
+        response = mock.Mock(status_code=429, headers={"retry-after": "7"}, text="")
+        request = mock.Mock(side_effect=[TooManyRequests(response), "results"])
+        with mock.patch.object(reddit_tools.time, "sleep") as sleep:
+            self.assertEqual(reddit_tools.with_retries(request), "results")
+        self.assertEqual(request.call_count, 2)
+        sleep.assert_called_once_with(7.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
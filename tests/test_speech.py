@@ -0,0 +1,186 @@
+"""
+Tests for chunked speech synthesis, run against a local stub of the speech endpoint
+instead of the OpenAI API.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from unittest import mock
+
+import openai
+
+from video_generator import speech
+from video_generator.media_cache import MediaCache
+
+
+def stub_pcm(text: str) -> bytes:
+    """
+    Returns the PCM the stub answers a text with: an even number of bytes that
+    identify the text.
+    """
+    data = text.encode("utf-8")
+    return data + b"\0" * (len(data) % 2)
+
+
+class StubSpeechServer(ThreadingHTTPServer):
+    """
+    Answers POST /audio/speech with stub_pcm of the input text. failures maps a text
+    to the status codes to answer its first requests with, and delays maps a text to
+    how long to wait before answering, to make later chunks finish first.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubSpeechHandler)
+        self.failures: Dict[str, List[int]] = {}
+        self.delays: Dict[str, float] = {}
+        self.requests: List[str] = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubSpeechHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        text = body["input"]
+        with self.server.lock:
+            self.server.requests.append(text)
+            failures = self.server.failures.get(text, [])
+            status = failures.pop(0) if failures else 200
+        time.sleep(self.server.delays.get(text, 0.0))
+
+        if status == 200:
+            data, content_type = stub_pcm(text), "application/octet-stream"
+        else:
+            data = json.dumps({"error": {"message": "Stub failure"}}).encode("utf-8")
+            content_type = "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SpeechTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StubSpeechServer()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        cache = MediaCache("speech", 1024 * 1024, self.temp_dir)
+        for patch in (
+            mock.patch.object(speech, "pcm_cache", cache),
+            mock.patch.object(speech, "RETRY_BACKOFF", 0.0),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        # The client's own retries are off, so only synthesize_chunk retries
+        self.client = openai.OpenAI(
+            api_key="test", base_url=self.server.base_url, max_retries=0
+        )
+
+    def read_wav(self, path: str) -> bytes:
+        with wave.open(path, "rb") as wav:
+            self.assertEqual(wav.getnchannels(), 1)
+            self.assertEqual(wav.getsampwidth(), speech.SAMPLE_WIDTH)
+            self.assertEqual(wav.getframerate(), speech.SAMPLE_RATE)
+            return wav.readframes(wav.getnframes())
+
+    def test_chunks_are_written_in_order(self):
+        transcript = "First sentence here. Second one! Third sentence? Fourth."
+        texts = speech.chunk_text(transcript, max_chars=20)
+        self.assertGreater(len(texts), 2)
+        # Earlier chunks answer slower, so they finish after the later ones
+        for i, text in enumerate(texts):
+            self.server.delays[text] = 0.05 * (len(texts) - i)
+
+        output_file = os.path.join(self.temp_dir, "speech.wav")
+        chunks = speech.synthesize(
+            self.client, transcript, output_file, max_chars=20, max_concurrency=4
+        )
+
+        self.assertEqual([chunk.text for chunk in chunks], texts)
+        self.assertEqual(
+            self.read_wav(output_file), b"".join(stub_pcm(text) for text in texts)
+        )
+        self.assertEqual(chunks[0].start, 0.0)
+        for previous, chunk in zip(chunks, chunks[1:]):
+            self.assertEqual(chunk.start, previous.end)
+        frames = len(self.read_wav(output_file)) // speech.SAMPLE_WIDTH
+        self.assertAlmostEqual(chunks[-1].end, frames / speech.SAMPLE_RATE)
+        self.assertFalse(os.path.exists(output_file + ".tmp.wav"))
+
+    def test_rate_limits_and_server_errors_are_retried(self):
+        self.server.failures["Retried text."] = [429, 500, 503]
+        with mock.patch.object(speech, "time") as clock:
+            pcm = speech.synthesize_chunk(self.client, "Retried text.", max_retries=3)
+
+        self.assertEqual(pcm, stub_pcm("Retried text."))
+        self.assertEqual(self.server.requests, ["Retried text."] * 4)
+        self.assertEqual(clock.sleep.call_count, 3)
+
+    def test_backoff_doubles_with_jitter(self):
+        self.server.failures["Backoff."] = [429, 429, 429]
+        with (
+            mock.patch.object(speech, "RETRY_BACKOFF", 1.0),
+            mock.patch.object(speech, "time") as clock,
+        ):
+            speech.synthesize_chunk(self.client, "Backoff.", max_retries=3)
+
+        delays = [call.args[0] for call in clock.sleep.call_args_list]
+        self.assertEqual(len(delays), 3)
+        for attempt, delay in enumerate(delays):
+            self.assertGreaterEqual(delay, 0.5 * 2**attempt)
+            self.assertLessEqual(delay, 2**attempt)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.failures["Failing."] = [500, 500, 500]
+        with self.assertRaises(openai.InternalServerError):
+            speech.synthesize_chunk(self.client, "Failing.", max_retries=2)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.failures["Bad request."] = [400]
+        with self.assertRaises(openai.BadRequestError):
+            speech.synthesize_chunk(self.client, "Bad request.")
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_cached_chunks_skip_the_endpoint(self):
+        speech.synthesize_chunk(self.client, "Cached.")
+        speech.synthesize_chunk(self.client, "Cached.")
+        self.assertEqual(self.server.requests, ["Cached."])
+
+    def test_failed_synthesis_leaves_no_file(self):
+        self.server.failures["Broken."] = [500] * (speech.MAX_RETRIES + 1)
+        output_file = os.path.join(self.temp_dir, "broken.wav")
+        with self.assertRaises(openai.InternalServerError):
+            speech.synthesize(self.client, "Fine. Broken.", output_file, max_chars=8)
+        self.assertFalse(os.path.exists(output_file))
+        self.assertFalse(os.path.exists(output_file + ".tmp.wav"))
+
+    def test_negative_max_retries_is_rejected(self):
+        with self.assertRaises(ValueError):
+            speech.synthesize_chunk(self.client, "Text.", max_retries=-1)
+        self.assertEqual(self.server.requests, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Calibration of the metric-based caption sizes against the rendered ones.
+
+Caption wrapping used to measure text with Pillow and scale it by 3.012 to match the
+size ImageMagick rendered it at. Captions are now rendered by GlyphAtlas itself, so
+the measured and rendered sizes come from the same font metrics and pen positions
+and have to be equal, with no scale factor in between. Both have to contain all the
+ink Pillow draws for the same text.
+"""
+
+import glob
+import os
+import random
+import string
+import unittest
+
+from PIL import Image, ImageDraw, ImageFont
+
+from video_generator.glyph_atlas import get_atlas
+from video_generator.text_metrics import get_measurer
+
+FONTS_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "video_generator", "assets", "fonts"
+)
+FONTS = sorted(glob.glob(os.path.join(FONTS_DIR, "*.ttf")))
+FONTSIZE = 80
+STROKE_WIDTH = 4
+CHARACTERS = string.ascii_letters + string.digits + " .,!?'\"-:;()&"
+ACCENTED = "ÉÄÅéñçü"
+
+
+def random_lines(count: int, seed: int = 0, characters: str = CHARACTERS):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(characters) for _ in range(rng.randint(1, 30)))
+
+
+def ink_bounds(font: str, text: str, stroked: bool, origin: int):
+    """
+    Returns the bounding box of the ink Pillow draws for the text at (origin, origin).
+    """
+    pil_font = ImageFont.truetype(font, FONTSIZE)
+    image = Image.new("L", (origin * 2 + FONTSIZE * len(text), origin * 2 + FONTSIZE))
+    ImageDraw.Draw(image).text(
+        (origin, origin),
+        text,
+        font=pil_font,
+        fill=255,
+        stroke_width=STROKE_WIDTH if stroked else 0,
+        stroke_fill=255,
+    )
+    return image.getbbox()
+
+
+class TextMetricsTest(unittest.TestCase):
+    def test_fonts_are_bundled(self):
+        self.assertTrue(FONTS)
+
+    def test_measured_size_matches_rendered_size(self):
+        for font in FONTS:
+            for stroke_color in (None, "black"):
+                stroked = stroke_color is not None
+                measurer = get_measurer(font, FONTSIZE, STROKE_WIDTH, stroked)
+                atlas = get_atlas(font, FONTSIZE, STROKE_WIDTH)
+                for text in random_lines(100):
+                    name = os.path.basename(font)
+                    with self.subTest(font=name, stroked=stroked, text=text):
+                        rendered = atlas.render_line(
+                            [(char, "white") for char in text], stroke_color
+                        )
+                        height, width = rendered.shape[:2]
+                        self.assertEqual(measurer.measure(text), (width, height))
+
+    def test_measured_extents_contain_pillow_ink(self):
+        origin = FONTSIZE * 2
+        for font in FONTS:
+            for stroked in (False, True):
+                measurer = get_measurer(font, FONTSIZE, STROKE_WIDTH, stroked)
+                lines = random_lines(50, characters=CHARACTERS + ACCENTED)
+                for text in lines:
+                    name = os.path.basename(font)
+                    with self.subTest(font=name, stroked=stroked, text=text):
+                        bounds = ink_bounds(font, text, stroked, origin)
+                        if bounds is None:
+                            continue
+                        line = measurer.advance(
+                            measurer.empty, measurer.word_metrics(text)
+                        )
+                        x0, top, x1, bottom = bounds
+                        self.assertGreaterEqual(x0, origin + line.x0)
+                        self.assertLessEqual(x1, origin + line.x1)
+                        self.assertGreaterEqual(top, origin + line.top)
+                        self.assertLessEqual(bottom, origin + line.bottom)
+
+
+if __name__ == "__main__":
+    unittest.main()
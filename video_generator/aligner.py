@@ -0,0 +1,281 @@
+import subprocess
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy
+
+from .encoder import get_ffmpeg_binary
+
+SAMPLE_RATE = 16000
+# Length of the frames voice activity is detected on, in seconds
+FRAME_LENGTH = 0.01
+# Silences shorter than this are treated as part of the speech around them
+MIN_PAUSE = 0.12
+# Bursts of sound shorter than this are treated as noise
+MIN_SPEECH = 0.05
+# Frames quieter than the loudest speech by this many dB are silence
+SILENCE_DB = 35.0
+
+# Relative spoken length of a word: a fixed onset plus a share per letter or digit
+WORD_WEIGHT = 1.5
+LETTER_WEIGHT = 1.0
+DIGIT_WEIGHT = 2.5
+# How much a pause prefers a word boundary after punctuation
+PUNCTUATION_BONUS = {".": 0.6, "!": 0.6, "?": 0.6, ";": 0.5, ":": 0.4, ",": 0.4}
+PUNCTUATION_SCALE = 4.0
+# Cost of leaving a pause unmatched
+SKIP_COST = 4.0
+# How many pauses in a row may be left unmatched
+MAX_SKIP = 3
+# Variance of the spoken duration of a stretch of words, in seconds per second of speech
+SPEECH_VARIANCE = 0.02
+# How far from its expected time a word boundary may be matched to a pause, in seconds
+# and as a share of the time elapsed
+PAUSE_BAND = 2.0
+PAUSE_BAND_RATIO = 0.1
+
+
+@dataclass
+class AlignedWord:
+    """
+    A transcript word with its time span in seconds, matching the words returned by Whisper.
+    """
+
+    word: str
+    start: float
+    end: float
+
+
+def load_audio(audio_file: str, sample_rate: int = SAMPLE_RATE) -> numpy.ndarray:
+    """
+    Decodes an audio file to mono float32 samples with ffmpeg.
+    """
+    result = subprocess.run(
+        [
+            get_ffmpeg_binary(),
+            "-loglevel",
+            "error",
+            "-i",
+            audio_file,
+            "-f",
+            "s16le",
+            "-ac",
+            "1",
+            "-ar",
+            str(sample_rate),
+            "-",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="replace")
+        raise IOError(f"ffmpeg failed to decode {audio_file}:\n{stderr}")
+    return (
+        numpy.frombuffer(result.stdout, dtype=numpy.int16).astype(numpy.float32) / 32768
+    )
+
+
+def runs(mask: numpy.ndarray) -> List[Tuple[int, int]]:
+    """
+    Returns the [start, end) index ranges of the True runs in a boolean array.
+    """
+    edges = numpy.diff(numpy.concatenate(([0], mask.astype(numpy.int8), [0])))
+    return list(zip(numpy.flatnonzero(edges == 1), numpy.flatnonzero(edges == -1)))
+
+
+def speech_regions(
+    samples: numpy.ndarray, sample_rate: int = SAMPLE_RATE
+) -> List[Tuple[float, float]]:
+    """
+    Splits audio into regions of speech separated by pauses, using frame energy.
+    Returns (start, end) times in seconds.
+    """
+    frame_size = int(sample_rate * FRAME_LENGTH)
+    frame_count = len(samples) // frame_size
+    if frame_count == 0:
+        return []
+
+    frames = samples[: frame_count * frame_size].reshape(frame_count, frame_size)
+    energy = 10 * numpy.log10(numpy.mean(frames**2, axis=1) + 1e-10)
+    voiced = energy > max(energy.max() - SILENCE_DB, -90.0)
+
+    # Close short pauses, then drop short bursts
+    for start, end in runs(~voiced):
+        if 0 < start and end < frame_count and end - start < MIN_PAUSE / FRAME_LENGTH:
+            voiced[start:end] = True
+    return [
+        (start * FRAME_LENGTH, end * FRAME_LENGTH)
+        for start, end in runs(voiced)
+        if end - start >= MIN_SPEECH / FRAME_LENGTH
+    ]
+
+
+def word_weight(word: str) -> float:
+    """
+    Returns the relative time it takes to speak a word.
+    """
+    letters = sum(c.isalpha() for c in word)
+    digits = sum(c.isdigit() for c in word)
+    return WORD_WEIGHT + letters * LETTER_WEIGHT + digits * DIGIT_WEIGHT
+
+
+def assign_pauses(
+    regions: List[Tuple[float, float]], weights: numpy.ndarray, bonuses: numpy.ndarray
+) -> List[Tuple[int, int]]:
+    """
+    Matches the pauses between speech regions to word boundaries.
+    Boundary b lies before word b, and weights holds the cumulative word weights by boundary.
+    Every pause either matches a boundary whose expected time is near it or is skipped.
+    The matching is chosen with a Viterbi search that penalizes speech between consecutive
+    matches whose duration deviates from its words' expected duration, rewards boundaries
+    after punctuation and penalizes skipped pauses. Returns (region, boundary) pairs in
+    order, ending with the last region and the last boundary.
+    """
+    voiced = numpy.cumsum([end - start for start, end in regions])
+    word_count = len(weights) - 1
+    rate = voiced[-1] / weights[-1]
+    expected = weights * rate
+
+    # One layer of candidate boundaries per pause, between the start and the end
+    layers = [(-1, numpy.array([0]))]
+    for k in range(len(regions) - 1):
+        band = max(PAUSE_BAND, PAUSE_BAND_RATIO * voiced[k])
+        first = max(int(numpy.searchsorted(expected, voiced[k] - band)), 1)
+        last = int(numpy.searchsorted(expected, voiced[k] + band, side="right"))
+        last = min(last, word_count)
+        if first < last:
+            layers.append((k, numpy.arange(first, last)))
+    layers.append((len(regions) - 1, numpy.array([word_count])))
+
+    def voiced_at(k: int) -> float:
+        return voiced[k] if k >= 0 else 0.0
+
+    costs = [numpy.zeros(1)]
+    back: List[Tuple[numpy.ndarray, numpy.ndarray]] = [(numpy.zeros(0), numpy.zeros(0))]
+    for i in range(1, len(layers)):
+        k, boundaries = layers[i]
+        best = numpy.full(len(boundaries), numpy.inf)
+        best_layer = numpy.zeros(len(boundaries), dtype=int)
+        best_node = numpy.zeros(len(boundaries), dtype=int)
+
+        # The start is always a predecessor, so every node stays reachable
+        for j in {0, *range(max(i - 1 - MAX_SKIP, 0), i)}:
+            prev_k, prev_boundaries = layers[j]
+            elapsed = voiced_at(k) - voiced_at(prev_k)
+            spoken = (
+                weights[boundaries][None, :] - weights[prev_boundaries][:, None]
+            ) * rate
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                cost = (
+                    costs[j][:, None]
+                    + (elapsed - spoken) ** 2 / (SPEECH_VARIANCE * spoken + 0.01)
+                    + SKIP_COST * (k - prev_k - 1)
+                )
+            cost[spoken <= 0] = numpy.inf
+
+            node = numpy.argmin(cost, axis=0)
+            cost = cost[node, numpy.arange(len(boundaries))]
+            better = cost < best
+            best[better] = cost[better]
+            best_layer[better] = j
+            best_node[better] = node[better]
+
+        if i < len(layers) - 1:
+            best -= PUNCTUATION_SCALE * bonuses[boundaries]
+        costs.append(best)
+        back.append((best_layer, best_node))
+
+    matches = []
+    i, node = len(layers) - 1, 0
+    while i > 0:
+        k, boundaries = layers[i]
+        matches.append((k, int(boundaries[node])))
+        i, node = back[i][0][node], back[i][1][node]
+    return matches[::-1]
+
+
+def align_words(
+    samples: numpy.ndarray, transcript: str, offset: float = 0.0
+) -> List[AlignedWord]:
+    """
+    Times the words of a transcript within a stretch of speech audio starting at offset seconds.
+    """
+    tokens = transcript.split()
+    if not tokens:
+        return []
+    duration = len(samples) / SAMPLE_RATE
+    regions = speech_regions(samples) or [(0.0, duration)]
+
+    weights = numpy.concatenate(([0.0], numpy.cumsum([word_weight(t) for t in tokens])))
+    bonuses = numpy.array(
+        [0.0] + [PUNCTUATION_BONUS.get(t.rstrip("\"')]")[-1:], 0.0) for t in tokens]
+    )
+
+    words = []
+    first_region, first_boundary = 0, 0
+    for last_region, last_boundary in assign_pauses(regions, weights, bonuses):
+        group = regions[first_region : last_region + 1]
+
+        # Maps speech time within the group to audio time, skipping its inner pauses
+        speech_times, audio_times = [0.0], [group[0][0]]
+        for start, end in group:
+            if end > audio_times[-1]:
+                speech_times += [speech_times[-1], speech_times[-1] + end - start]
+                audio_times += [start, end]
+
+        group_weights = weights[first_boundary : last_boundary + 1]
+        positions = (
+            (group_weights - group_weights[0])
+            / (group_weights[-1] - group_weights[0])
+            * speech_times[-1]
+        )
+        starts = numpy.interp(positions[:-1] + 1e-6, speech_times, audio_times)
+        ends = numpy.interp(positions[1:] - 1e-6, speech_times, audio_times)
+
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            words.append(
+                AlignedWord(
+                    word=" " + tokens[first_boundary + i],
+                    start=round(offset + float(start), 3),
+                    end=round(offset + float(end), 3),
+                )
+            )
+        first_region, first_boundary = last_region + 1, last_boundary
+
+    return words
+
+
+def align(audio_file: str, transcript: str) -> list[dict]:
+    """
+    Aligns a known transcript to its speech audio without a speech recognizer.
+    Speech regions are found by frame energy, the pauses between them are matched to word
+    boundaries, and the words in between are timed in proportion to their length.
+    Returns segments in the same format as transcriber.transcribe_with_api.
+    """
+    samples = load_audio(audio_file)
+    words = align_words(samples, transcript)
+    if not words:
+        duration = len(samples) / SAMPLE_RATE
+        return [{"start": 0.0, "end": duration, "words": []}]
+    return [{"start": words[0].start, "end": words[-1].end, "words": words}]
+
+
+def align_chunks(audio_file: str, chunks: list) -> list[dict]:
+    """
+    Aligns speech that was synthesized in chunks with known timings, such as the
+    speech.SpeechChunk list returned by speech.synthesize. Every chunk is aligned within
+    its own time span, so errors cannot spread across chunks. Returns one segment per chunk.
+    """
+    samples = load_audio(audio_file)
+    segments = []
+    for chunk in chunks:
+        chunk_samples = samples[
+            int(chunk.start * SAMPLE_RATE) : int(chunk.end * SAMPLE_RATE)
+        ]
+        words = align_words(chunk_samples, chunk.text, chunk.start)
+        if words:
+            segments.append(
+                {"start": words[0].start, "end": words[-1].end, "words": words}
+            )
+    return segments
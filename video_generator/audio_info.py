@@ -0,0 +1,157 @@
+import os
+import struct
+from dataclasses import dataclass
+
+
+@dataclass
+class AudioInfo:
+    """
+    Duration in seconds, sample rate and channel count of an audio file.
+    """
+
+    duration: float
+    sample_rate: int
+    channels: int
+
+
+def pcm_duration(
+    byte_count: int, sample_rate: int, channels: int = 1, sample_width: int = 2
+) -> float:
+    """
+    Returns the duration of raw PCM audio from its size in bytes.
+    """
+    return byte_count / (sample_rate * channels * sample_width)
+
+
+def wav_info(path: str) -> AudioInfo:
+    """
+    Reads the info of a WAV file from its RIFF chunk headers.
+    A data chunk with an unknown size, as written by streaming encoders, is taken to
+    extend to the end of the file.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError(f"{path} is not a WAV file")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIH", f.read(14))
+                f.seek(chunk_size - 14 + chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path} has no fmt chunk before its data")
+                _, channels, sample_rate, _, block_align = fmt
+                available = file_size - f.tell()
+                if chunk_size in (0, 0xFFFFFFFF) or chunk_size > available:
+                    chunk_size = available
+                return AudioInfo(
+                    duration=chunk_size // block_align / sample_rate,
+                    sample_rate=sample_rate,
+                    channels=channels,
+                )
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+# Bitrates in kbit/s by (MPEG-1, layer) or (MPEG-2/2.5, layer) and the header's index
+MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Sample rates by MPEG version bits and the header's index
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+
+def mp3_info(path: str) -> AudioInfo:
+    """
+    Reads the info of an MP3 file from its first frame header. The duration comes from
+    the frame count of a Xing/Info or VBRI header if there is one, otherwise from the
+    bitrate, assuming a constant bitrate.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        data = f.read(64 * 1024)
+
+    offset = 0
+    if data[:3] == b"ID3":
+        size = data[6:10]
+        offset = 10 + (size[0] << 21 | size[1] << 14 | size[2] << 7 | size[3])
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(64 * 1024)
+        file_size -= offset
+        offset = 0
+
+    while offset + 4 <= len(data):
+        if data[offset] == 0xFF and data[offset + 1] & 0xE0 == 0xE0:
+            header = struct.unpack(">I", data[offset : offset + 4])[0]
+            version = header >> 19 & 3
+            layer = 4 - (header >> 17 & 3)
+            bitrate_index = header >> 12 & 15
+            rate_index = header >> 10 & 3
+            if (
+                version != 1
+                and layer != 4
+                and 0 < bitrate_index < 15
+                and rate_index < 3
+            ):
+                break
+        offset += 1
+    else:
+        raise ValueError(f"{path} has no MP3 frame header")
+
+    mpeg1 = version == 3
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    channels = 1 if header >> 6 & 3 == 3 else 2
+    bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 3 and not mpeg1:
+        samples_per_frame = 576
+    else:
+        samples_per_frame = 1152
+
+    # Xing/Info follows the side information, VBRI always sits 32 bytes into the frame
+    side_info = (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+    frame_count = None
+    xing = offset + 4 + side_info
+    if data[xing : xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4 : xing + 8])[0]
+        if flags & 1:
+            frame_count = struct.unpack(">I", data[xing + 8 : xing + 12])[0]
+    elif data[offset + 36 : offset + 40] == b"VBRI":
+        frame_count = struct.unpack(">I", data[offset + 50 : offset + 54])[0]
+
+    if frame_count is not None:
+        duration = frame_count * samples_per_frame / sample_rate
+    else:
+        duration = (file_size - offset) * 8 / bitrate
+    return AudioInfo(duration=duration, sample_rate=sample_rate, channels=channels)
+
+
+def probe_audio(path: str) -> AudioInfo:
+    """
+    Reads the duration, sample rate and channel count of a WAV or MP3 file from its
+    headers, without decoding any audio.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(12)
+    if magic[:4] == b"RIFF" and magic[8:12] == b"WAVE":
+        return wav_info(path)
+    return mp3_info(path)
@@ -0,0 +1,286 @@
+import json
+import logging
+import os
+import random
+import re
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+from .encoder import get_ffmpeg_binary
+
+VIDEO_DIR: str = os.path.join(os.path.dirname(__file__), "assets", "videos")
+OUT_DIR: str = os.path.join(os.path.dirname(__file__), "out")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".webm")
+# Set to 1 to render from proxies transcoded to the output size and frame rate
+USE_PROXIES = os.environ.get("BACKGROUND_PROXIES", "").lower() in ("1", "true", "yes")
+# "random" or "lru", which prefers the footage that was used least recently
+STRATEGY = os.environ.get("BACKGROUND_STRATEGY", "random")
+STRATEGIES = ("random", "lru")
+
+
+@dataclass
+class BackgroundInfo:
+    """
+    Cached metadata of a background video. `keyframes` holds keyframe timestamps in
+    seconds and `last_used` maps a keyframe timestamp to when footage starting there
+    was last used.
+    """
+
+    path: str
+    mtime: float
+    size: int
+    duration: float
+    fps: float
+    width: int
+    height: int
+    keyframes: List[float]
+    last_used: Dict[str, float] = field(default_factory=dict)
+
+
+def probe_keyframes(path: str) -> List[float]:
+    """
+    Returns the keyframe timestamps of a video, decoding only its keyframes.
+    """
+    result = subprocess.run(
+        [
+            get_ffmpeg_binary(),
+            "-hide_banner",
+            "-skip_frame",
+            "nokey",
+            "-i",
+            path,
+            "-an",
+            "-vf",
+            "showinfo",
+            "-f",
+            "null",
+            "-",
+        ],
+        stderr=subprocess.PIPE,
+    )
+    stderr = result.stderr.decode("utf-8", errors="replace")
+    keyframes = sorted({float(t) for t in re.findall(r"pts_time:([0-9.]+)", stderr)})
+    return keyframes or [0.0]
+
+
+def probe(path: str) -> BackgroundInfo:
+    """
+    Reads the duration, frame rate, size and keyframes of a video.
+    """
+    infos = ffmpeg_parse_infos(path)
+    stat = os.stat(path)
+    return BackgroundInfo(
+        path=path,
+        mtime=stat.st_mtime,
+        size=stat.st_size,
+        duration=infos["duration"],
+        fps=infos["video_fps"],
+        width=infos["video_size"][0],
+        height=infos["video_size"][1],
+        keyframes=probe_keyframes(path),
+    )
+
+
+class BackgroundLibrary:
+    """
+    Index of the background videos under assets/videos.
+    Metadata is cached in a JSON index, so a video is only probed again when it changes.
+    Offsets into the footage are picked at random or least recently used, snapped to
+    keyframes so seeking to them is cheap. With use_proxies, videos are transcoded once
+    to the output size and frame rate with a regular keyframe interval, so rendering
+    never has to scale the background.
+    """
+
+    def __init__(
+        self,
+        video_dir: str = VIDEO_DIR,
+        index_file: str = os.path.join(OUT_DIR, "background_index.json"),
+        proxy_dir: str = os.path.join(OUT_DIR, "proxies"),
+        output_size: Tuple[int, int] = (1080, 1920),
+        fps: float = 30,
+        use_proxies: bool = USE_PROXIES,
+        strategy: str = STRATEGY,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Unknown background strategy '{strategy}', use one of {STRATEGIES}"
+            )
+        self.video_dir = video_dir
+        self.index_file = index_file
+        self.proxy_dir = proxy_dir
+        self.output_size = output_size
+        self.fps = fps
+        self.use_proxies = use_proxies
+        self.strategy = strategy
+        self.lock = threading.RLock()
+        self.index: Dict[str, BackgroundInfo] = self.load_index()
+
+    def load_index(self) -> Dict[str, BackgroundInfo]:
+        if not os.path.exists(self.index_file):
+            return {}
+        with open(self.index_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {path: BackgroundInfo(**info) for path, info in data.items()}
+
+    def save_index(self) -> None:
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        temp_file = self.index_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({path: asdict(info) for path, info in self.index.items()}, f)
+        os.replace(temp_file, self.index_file)
+
+    def get_info(self, path: str) -> BackgroundInfo:
+        """
+        Returns the metadata of a video, probing it if it is new or has changed.
+        """
+        stat = os.stat(path)
+        info = self.index.get(path)
+        if info is None or info.mtime != stat.st_mtime or info.size != stat.st_size:
+            info = probe(path)
+            self.index[path] = info
+            self.save_index()
+        return info
+
+    def assets(self) -> List[BackgroundInfo]:
+        """
+        Returns the metadata of every background video, using proxies if enabled.
+        """
+        paths = sorted(
+            os.path.join(self.video_dir, name)
+            for name in os.listdir(self.video_dir)
+            if name.lower().endswith(VIDEO_EXTENSIONS)
+        )
+        if self.use_proxies:
+            return [self.get_proxy(path) for path in paths]
+        return [self.get_info(path) for path in paths]
+
+    def get_proxy(self, path: str) -> BackgroundInfo:
+        """
+        Returns the metadata of a video's proxy in the output profile, transcoding it first if needed.
+        """
+        width, height = self.output_size
+        name = os.path.splitext(os.path.basename(path))[0]
+        proxy_path = os.path.join(
+            self.proxy_dir, f"{name}_{width}x{height}_{self.fps:g}.mp4"
+        )
+
+        if not os.path.exists(proxy_path) or os.path.getmtime(
+            proxy_path
+        ) < os.path.getmtime(path):
+            os.makedirs(self.proxy_dir, exist_ok=True)
+            self.transcode_proxy(path, proxy_path)
+
+        return self.get_info(proxy_path)
+
+    def transcode_proxy(self, path: str, proxy_path: str) -> None:
+        width, height = self.output_size
+        gop_size = str(int(round(self.fps * 2)))
+        temp_path = proxy_path + ".tmp.mp4"
+        result = subprocess.run(
+            [
+                get_ffmpeg_binary(),
+                "-y",
+                "-loglevel",
+                "error",
+                "-i",
+                path,
+                "-vf",
+                f"scale={width}:{height}:force_original_aspect_ratio=increase,"
+                f"crop={width}:{height}",
+                "-r",
+                f"{self.fps:g}",
+                "-c:v",
+                "libx264",
+                "-preset",
+                "slow",
+                "-crf",
+                "18",
+                "-g",
+                gop_size,
+                "-keyint_min",
+                gop_size,
+                "-sc_threshold",
+                "0",
+                "-pix_fmt",
+                "yuv420p",
+                "-c:a",
+                "aac",
+                temp_path,
+            ],
+            stderr=subprocess.PIPE,
+        )
+        if result.returncode != 0:
+            stderr = result.stderr.decode("utf-8", errors="replace")
+            raise IOError(f"ffmpeg failed to transcode {path}:\n{stderr}")
+        os.replace(temp_path, proxy_path)
+
+    def choose(
+        self, duration: float, strategy: Optional[str] = None
+    ) -> Tuple[BackgroundInfo, float]:
+        """
+        Picks a background video and a keyframe to start at, such that `duration` seconds
+        of footage follow it. strategy is "random" or "lru", which prefers footage that
+        was used least recently, and defaults to the library's strategy.
+        If no video is long enough, the longest one is used from its first keyframe and
+        its last frame is held until the end.
+        Safe to call from several threads.
+        """
+        strategy = strategy or self.strategy
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown background strategy '{strategy}'")
+
+        with self.lock:
+            assets = self.assets()
+            candidates = [
+                (info, keyframe)
+                for info in assets
+                for keyframe in info.keyframes
+                if keyframe + duration <= info.duration
+            ]
+            if not candidates:
+                info = max(assets, key=lambda info: info.duration)
+                logging.warning(
+                    f"No background video is at least {duration:.1f}s long, "
+                    f"holding the last frame of {os.path.basename(info.path)}"
+                )
+                candidates = [(info, info.keyframes[0])]
+
+            if strategy == "random":
+                info, start = random.choice(candidates)
+            else:
+                info, start = min(
+                    candidates, key=lambda c: c[0].last_used.get(f"{c[1]:g}", 0.0)
+                )
+
+            self.mark_used(info, start, duration)
+            return info, start
+
+    def mark_used(self, info: BackgroundInfo, start: float, duration: float) -> None:
+        """
+        Marks every keyframe in [start, start + duration) as used now.
+        """
+        now = time.time()
+        for keyframe in info.keyframes:
+            if start <= keyframe < start + duration:
+                info.last_used[f"{keyframe:g}"] = now
+        self.save_index()
+
+
+background_library: Optional[BackgroundLibrary] = None
+
+
+def get_background_library() -> BackgroundLibrary:
+    """
+    Returns the shared background library, creating it on first use.
+    It uses proxies if BACKGROUND_PROXIES is set, and picks footage with the
+    BACKGROUND_STRATEGY strategy.
+    """
+    global background_library
+    if background_library is None:
+        background_library = BackgroundLibrary()
+    return background_library
@@ -0,0 +1,156 @@
+from dataclasses import dataclass, replace
+from typing import List, Tuple, Union
+
+import numpy
+from moviepy.editor import VideoClip
+
+Position = Tuple[Union[int, str], Union[int, str]]
+
+
+@dataclass
+class Overlay:
+    """
+    A static RGBA image shown over the base video between `start` and `end`.
+    `rgb` is a float32 (h, w, 3) array, `alpha` a float32 (h, w, 1) array in [0, 1].
+    """
+
+    rgb: numpy.ndarray
+    alpha: numpy.ndarray
+    x: int
+    y: int
+    start: float
+    end: float
+
+    def retimed(self, start: float, end: float) -> "Overlay":
+        """
+        Returns a copy shown between start and end that shares this overlay's pixels.
+        """
+        return replace(self, start=start, end=end)
+
+    def cropped(self, x0: int, x1: int) -> "Overlay":
+        """
+        Returns columns [x0, x1) of the overlay as an overlay at the same place on the frame.
+        The pixels are views of this overlay's arrays.
+        """
+        return replace(
+            self,
+            rgb=self.rgb[:, x0:x1],
+            alpha=self.alpha[:, x0:x1],
+            x=self.x + x0,
+        )
+
+
+def resolve_position(
+    pos: Position, size: Tuple[int, int], frame_size: Tuple[int, int]
+) -> Tuple[int, int]:
+    """
+    Resolves a moviepy style position, where either axis may be "center", to pixels.
+    """
+    x, y = pos
+    if x == "center":
+        x = (frame_size[0] - size[0]) // 2
+    if y == "center":
+        y = (frame_size[1] - size[1]) // 2
+    return int(x), int(y)
+
+
+def to_overlay(
+    clip, start: float, end: float, pos: Position, frame_size: Tuple[int, int]
+) -> Overlay:
+    """
+    Converts a static clip, such as an ImageClip or text clip, to an Overlay.
+    """
+    rgb = clip.get_frame(0).astype(numpy.float32)
+    if clip.mask is not None:
+        alpha = clip.mask.get_frame(0).astype(numpy.float32)[:, :, None]
+    else:
+        alpha = numpy.ones(rgb.shape[:2] + (1,), dtype=numpy.float32)
+
+    x, y = resolve_position(pos, clip.size, frame_size)
+    return Overlay(rgb, alpha, x, y, start, end)
+
+
+def from_rgba(
+    rgba: numpy.ndarray,
+    start: float,
+    end: float,
+    pos: Position,
+    frame_size: Tuple[int, int],
+) -> Overlay:
+    """
+    Converts an RGBA uint8 array to an Overlay, the same way to_overlay converts an
+    ImageClip created from it.
+    """
+    rgb = rgba[:, :, :3].astype(numpy.float32)
+    alpha = (rgba[:, :, 3] / 255.0).astype(numpy.float32)[:, :, None]
+    x, y = resolve_position(pos, (rgba.shape[1], rgba.shape[0]), frame_size)
+    return Overlay(rgb, alpha, x, y, start, end)
+
+
+class CaptionTimeline:
+    """
+    Interval index over overlays.
+    Overlays are kept sorted by start time, so the ones active at time t are found
+    with two binary searches instead of checking every overlay on every frame.
+    """
+
+    def __init__(self, overlays: List[Overlay]):
+        self.overlays = overlays
+        starts = numpy.array([o.start for o in overlays], dtype=numpy.float64)
+        ends = numpy.array([o.end for o in overlays], dtype=numpy.float64)
+
+        self.order = numpy.argsort(starts, kind="stable")
+        self.starts = starts[self.order]
+        self.ends = ends[self.order]
+        self.max_duration = float((ends - starts).max()) if overlays else 0.0
+
+    def active(self, t: float) -> List[Overlay]:
+        """
+        Returns the overlays visible at time t, in the order they were added.
+        """
+        lo = numpy.searchsorted(self.starts, t - self.max_duration, side="left")
+        hi = numpy.searchsorted(self.starts, t, side="right")
+        candidates = numpy.nonzero(self.ends[lo:hi] > t)[0] + lo
+        return [self.overlays[i] for i in numpy.sort(self.order[candidates])]
+
+
+def blend(frame: numpy.ndarray, overlay: Overlay) -> None:
+    """
+    Alpha-blends an overlay into an RGB uint8 frame in place, clipping it to the frame.
+    """
+    frame_h, frame_w = frame.shape[:2]
+    h, w = overlay.alpha.shape[:2]
+
+    x0, y0 = max(overlay.x, 0), max(overlay.y, 0)
+    x1, y1 = min(overlay.x + w, frame_w), min(overlay.y + h, frame_h)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    src = (slice(y0 - overlay.y, y1 - overlay.y), slice(x0 - overlay.x, x1 - overlay.x))
+    alpha = overlay.alpha[src]
+    region = frame[y0:y1, x0:x1].astype(numpy.float32)
+    region += (overlay.rgb[src] - region) * alpha
+    frame[y0:y1, x0:x1] = region
+
+
+def composite(video: VideoClip, overlays: List[Overlay]) -> VideoClip:
+    """
+    Returns a clip that draws the active overlays over each frame of the video in a single pass.
+    """
+    timeline = CaptionTimeline(overlays)
+
+    def make_frame(t):
+        frame = video.get_frame(t)
+        active = timeline.active(t)
+        if not active:
+            return frame
+
+        frame = frame.copy()
+        for overlay in active:
+            blend(frame, overlay)
+        return frame
+
+    clip = VideoClip(make_frame, duration=video.duration)
+    clip.fps = video.fps
+    clip.audio = video.audio
+    return clip
@@ -0,0 +1,170 @@
+import queue
+import subprocess
+import threading
+from typing import List, Optional, Tuple
+
+import numpy
+from moviepy.config import get_setting
+
+# x264 presets by purpose
+PRESETS = {
+    "preview": "ultrafast",
+    "final": "slow",
+}
+
+
+def get_ffmpeg_binary() -> str:
+    """
+    Returns the ffmpeg binary moviepy is configured with (IMAGEIO_FFMPEG_EXE).
+    """
+    return get_setting("FFMPEG_BINARY")
+
+
+class FFmpegEncoder:
+    """
+    Streams raw RGB frames over a pipe into a single ffmpeg process, which encodes them
+    with x264 and muxes an audio file as AAC in the same pass.
+    Frames are handed to a writer thread through a bounded queue, so rendering the next
+    frame overlaps with ffmpeg consuming the previous one while memory stays flat.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        size: Tuple[int, int],
+        fps: float,
+        audio_file: Optional[str] = None,
+        preset: str = "medium",
+        codec: str = "libx264",
+        audio_codec: str = "aac",
+        audio_bitrate: str = "192k",
+        threads: Optional[int] = None,
+        queue_size: int = 8,
+        extra_args: Optional[List[str]] = None,
+    ):
+        self.output_file = output_file
+        self.size = size
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.error: Optional[BaseException] = None
+
+        cmd = [
+            get_ffmpeg_binary(),
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "rawvideo",
+            "-vcodec",
+            "rawvideo",
+            "-s",
+            f"{size[0]}x{size[1]}",
+            "-pix_fmt",
+            "rgb24",
+            "-r",
+            f"{fps:.02f}",
+            "-i",
+            "-",
+        ]
+        if audio_file is not None:
+            cmd += ["-i", audio_file, "-map", "0:v:0", "-map", "1:a:0"]
+            cmd += ["-c:a", audio_codec, "-b:a", audio_bitrate]
+        cmd += [
+            "-c:v",
+            codec,
+            "-preset",
+            PRESETS.get(preset, preset),
+            "-pix_fmt",
+            "yuv420p",
+        ]
+        if threads is not None:
+            cmd += ["-threads", str(threads)]
+        cmd += (extra_args or []) + [output_file]
+
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+    def write_loop(self) -> None:
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                self.process.stdin.write(frame)
+            except (BrokenPipeError, OSError) as error:
+                self.error = error
+
+    def write_frame(self, frame: numpy.ndarray) -> None:
+        """
+        Queues a (h, w, 3) uint8 frame, blocking while the queue is full.
+        """
+        if self.error is not None:
+            self.raise_error()
+        self.queue.put(numpy.ascontiguousarray(frame, dtype=numpy.uint8).tobytes())
+
+    def close(self) -> None:
+        """
+        Flushes the queued frames and waits for ffmpeg to finish writing the file.
+        """
+        self.queue.put(None)
+        self.writer.join()
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        stderr = self.process.stderr.read().decode("utf-8", errors="replace")
+        self.process.wait()
+
+        if self.error is not None or self.process.returncode != 0:
+            self.raise_error(stderr)
+
+    def raise_error(self, stderr: str = "") -> None:
+        if not stderr:
+            self.process.kill()
+            stderr = self.process.stderr.read().decode("utf-8", errors="replace")
+        raise IOError(f"ffmpeg failed to write {self.output_file}:\n{stderr}")
+
+    def __enter__(self) -> "FFmpegEncoder":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.process.kill()
+            self.queue.put(None)
+            self.writer.join()
+            self.process.wait()
+
+
+def encode_clip(
+    clip,
+    output_file: str,
+    fps: float,
+    audio_file: Optional[str] = None,
+    preset: str = "medium",
+    threads: Optional[int] = None,
+    logger: Optional[str] = None,
+    extra_args: Optional[List[str]] = None,
+) -> None:
+    """
+    Renders every frame of a clip and streams it into ffmpeg, muxing audio_file if given.
+    """
+    with FFmpegEncoder(
+        output_file,
+        clip.size,
+        fps,
+        audio_file=audio_file,
+        preset=preset,
+        threads=threads,
+        extra_args=extra_args,
+    ) as encoder:
+        for frame in clip.iter_frames(fps=fps, logger=logger, dtype="uint8"):
+            encoder.write_frame(frame)
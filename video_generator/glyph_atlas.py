@@ -0,0 +1,268 @@
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from .render_cache import create_cache
+
+# Rasterized glyph bitmaps, shared by all atlases
+glyph_cache = create_cache("glyphs", 32 * 1024 * 1024)
+
+
+@dataclass
+class Glyph:
+    """
+    A single rasterized character.
+    `bitmap` is an RGBA array at least the font's line height tall, `left` is how far
+    the bitmap extends to the left of the pen position, `top` is the y offset of the
+    bitmap from the top of the line and `advance` is the horizontal distance to the
+    next pen position.
+    """
+
+    bitmap: numpy.ndarray
+    left: int
+    top: int
+    advance: float
+
+
+@dataclass(frozen=True)
+class CharMetrics:
+    """
+    Extents of a character relative to its pen position and the top of the line,
+    computed from the font without rasterizing it. The vertical extents cover both the
+    line box and the ink, so accents above the ascent aren't cut off.
+    """
+
+    advance: float
+    left: int
+    right: int
+    top: int
+    bottom: int
+
+
+class GlyphAtlas:
+    """
+    Rasterizes glyphs once per (font, size, color, stroke) with Pillow/FreeType
+    and blits them into a single RGBA array per line of text.
+    """
+
+    def __init__(self, font: str, fontsize: int, stroke_width: int = 0):
+        self.font_path = font
+        self.fontsize = fontsize
+        self.stroke_width = stroke_width
+        self.font = ImageFont.truetype(font, fontsize)
+        ascent, descent = self.font.getmetrics()
+        self.ascent = ascent
+        # Line box of glyphs that stay within the ascent and descent
+        self.top = -stroke_width
+        self.bottom = ascent + descent + stroke_width
+        self.char_metrics: Dict[Tuple[str, bool], CharMetrics] = {}
+
+    def get_metrics(self, char: str, stroked: bool) -> CharMetrics:
+        """
+        Returns the stroke-aware extents of a character, computed with getlength/getbbox.
+        """
+        key = (char, stroked)
+        metrics = self.char_metrics.get(key)
+        if metrics is None:
+            stroke_width = self.stroke_width if stroked else 0
+            advance = self.font.getlength(char)
+            x0, y0, x1, y1 = self.font.getbbox(char, stroke_width=stroke_width)
+            metrics = CharMetrics(
+                advance,
+                max(0, -x0),
+                max(int(numpy.ceil(advance)), x1),
+                min(self.top, y0),
+                max(self.bottom, y1),
+            )
+            self.char_metrics[key] = metrics
+        return metrics
+
+    def get_glyph(self, char: str, color: str, stroke_color: str | None) -> Glyph:
+        """
+        Returns the glyph for a character, rasterizing it on first use.
+        """
+        metrics = self.get_metrics(char, bool(stroke_color))
+        key = (
+            self.font_path,
+            self.fontsize,
+            self.stroke_width,
+            char,
+            color,
+            stroke_color,
+            metrics.top,
+            metrics.bottom,
+        )
+        bitmap = glyph_cache.get(key)
+        if bitmap is None:
+            bitmap = self.rasterize(char, color, stroke_color)
+            glyph_cache.put(key, bitmap)
+
+        return Glyph(bitmap, metrics.left, metrics.top, metrics.advance)
+
+    def rasterize(
+        self, char: str, color: str, stroke_color: str | None
+    ) -> numpy.ndarray:
+        metrics = self.get_metrics(char, bool(stroke_color))
+        width = metrics.left + metrics.right
+        height = metrics.bottom - metrics.top
+        image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        draw.text(
+            (metrics.left, -metrics.top),
+            char,
+            font=self.font,
+            fill=color,
+            stroke_width=self.stroke_width if stroke_color else 0,
+            stroke_fill=stroke_color,
+        )
+        return numpy.array(image)
+
+    @staticmethod
+    def pen_positions(glyphs: List[Glyph], kerning: float = 0.0) -> List[int]:
+        positions = []
+        offset_x = 0.0
+        for glyph in glyphs:
+            positions.append(int(offset_x))
+            offset_x += glyph.advance + kerning
+        return positions
+
+    @staticmethod
+    def extents(glyphs: List[Glyph], positions: List[int]) -> Tuple[int, int]:
+        if not glyphs:
+            return 0, 0
+        x0 = min(x - g.left for g, x in zip(glyphs, positions))
+        x1 = max(x - g.left + g.bitmap.shape[1] for g, x in zip(glyphs, positions))
+        return min(x0, 0), x1
+
+    def vertical_extents(self, glyphs: List[Glyph]) -> Tuple[int, int]:
+        """
+        Returns the top and bottom of the line box that holds all the glyphs.
+        """
+        top = min([self.top] + [glyph.top for glyph in glyphs])
+        bottom = max(
+            [self.bottom] + [glyph.top + glyph.bitmap.shape[0] for glyph in glyphs]
+        )
+        return top, bottom
+
+    def layout(
+        self,
+        chars: List[Tuple[str, str]],
+        stroke_color: str | None = None,
+        kerning: float = 0.0,
+    ) -> Tuple[List[Glyph], List[int], int]:
+        """
+        Returns the glyphs for a list of (character, color) pairs, the x offset of each
+        glyph bitmap on the line canvas and the width of the canvas.
+        """
+        glyphs = [self.get_glyph(char, color, stroke_color) for char, color in chars]
+        positions = self.pen_positions(glyphs, kerning)
+        x0, x1 = self.extents(glyphs, positions)
+        lefts = [x - glyph.left - x0 for glyph, x in zip(glyphs, positions)]
+        return glyphs, lefts, x1 - x0
+
+    def draw(
+        self,
+        glyphs: List[Glyph],
+        lefts: List[int],
+        x0: int,
+        x1: int,
+        bg_color: str = "transparent",
+        opacity: float = 1.0,
+    ) -> numpy.ndarray:
+        """
+        Blits the glyphs that intersect columns [x0, x1) of the line canvas into an RGBA array.
+        Later glyphs are composited over earlier ones, matching the layer order of
+        the per-character clips this replaces. The canvas is as tall as the line box of
+        all the glyphs, so every region of a line has the same height.
+        """
+        top, bottom = self.vertical_extents(glyphs)
+        canvas = numpy.zeros((bottom - top, x1 - x0, 4), dtype=numpy.float32)
+        if bg_color != "transparent":
+            canvas[:, :, :3] = ImageColor.getrgb(bg_color)[:3]
+            canvas[:, :, 3] = 255
+
+        for glyph, left in zip(glyphs, lefts):
+            if left < x1 and left + glyph.bitmap.shape[1] > x0:
+                blit(canvas, glyph.bitmap, left - x0, glyph.top - top)
+
+        if opacity < 1.0:
+            canvas[:, :, 3] *= opacity
+
+        return canvas.round().astype(numpy.uint8)
+
+    def render_line(
+        self,
+        chars: List[Tuple[str, str]],
+        stroke_color: str | None = None,
+        bg_color: str = "transparent",
+        opacity: float = 1.0,
+        kerning: float = 0.0,
+    ) -> numpy.ndarray:
+        """
+        Blits a list of (character, color) pairs into one RGBA array.
+        """
+        glyphs, lefts, width = self.layout(chars, stroke_color, kerning)
+        return self.draw(glyphs, lefts, 0, max(width, 1), bg_color, opacity)
+
+    def render_region(
+        self,
+        chars: List[Tuple[str, str]],
+        start: int,
+        stop: int,
+        stroke_color: str | None = None,
+        bg_color: str = "transparent",
+        opacity: float = 1.0,
+        kerning: float = 0.0,
+    ) -> Tuple[int, numpy.ndarray]:
+        """
+        Renders only the columns of the line covered by the glyphs of chars[start:stop].
+        Returns the x offset of the region on the line canvas and its RGBA array, which is
+        identical to the same columns of `render_line` for the same characters.
+        """
+        glyphs, lefts, _ = self.layout(chars, stroke_color, kerning)
+        run = list(zip(glyphs[start:stop], lefts[start:stop]))
+        x0 = min(left for _, left in run)
+        x1 = max(left + glyph.bitmap.shape[1] for glyph, left in run)
+        return x0, self.draw(glyphs, lefts, x0, x1, bg_color, opacity)
+
+
+def blit(canvas: numpy.ndarray, bitmap: numpy.ndarray, x: int, y: int) -> None:
+    """
+    Alpha-composites an RGBA uint8 bitmap over a float32 RGBA canvas in place,
+    clipping it to the canvas.
+    """
+    h, w = bitmap.shape[:2]
+    canvas_h, canvas_w = canvas.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, canvas_w), min(y + h, canvas_h)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    region = canvas[y0:y1, x0:x1]
+    src = bitmap[y0 - y : y1 - y, x0 - x : x1 - x].astype(numpy.float32)
+    src_a = src[:, :, 3:] / 255
+    dst_a = region[:, :, 3:] / 255
+
+    out_a = src_a + dst_a * (1 - src_a)
+    safe_a = numpy.where(out_a > 0, out_a, 1)
+    region[:, :, :3] = (
+        src[:, :, :3] * src_a + region[:, :, :3] * dst_a * (1 - src_a)
+    ) / safe_a
+    region[:, :, 3:] = out_a * 255
+
+
+atlases: Dict[Tuple[str, int, int], GlyphAtlas] = {}
+
+
+def get_atlas(font: str, fontsize: int, stroke_width: int = 0) -> GlyphAtlas:
+    """
+    Returns the shared atlas for a font, size and stroke width.
+    """
+    key = (font, fontsize, stroke_width)
+    atlas = atlases.get(key)
+    if atlas is None:
+        atlas = GlyphAtlas(font, fontsize, stroke_width)
+        atlases[key] = atlas
+    return atlas
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict, Optional
+
+MEDIA_CACHE_DIR: str = os.path.join(os.path.dirname(__file__), "out", "media_cache")
+MEDIA_CACHE_MAX_BYTES = int(
+    os.environ.get("MEDIA_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+)
+
+
+def content_key(*parts: Any) -> str:
+    """
+    Returns the SHA-256 of the JSON encoding of parts, to key cache entries by content.
+    """
+    data = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """
+    Returns the SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class MediaCache:
+    """
+    On-disk cache of files named by a content key, such as synthesized speech and
+    transcriptions, so re-running the pipeline on the same input skips the API calls.
+    The total size is bounded by max_bytes, evicting the least recently used files;
+    reading an entry refreshes its modification time.
+    """
+
+    def __init__(self, name: str, max_bytes: int, cache_dir: str = MEDIA_CACHE_DIR):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, self.name, key + suffix)
+
+    def get(self, key: str, suffix: str = "") -> Optional[bytes]:
+        """
+        Returns the cached contents for the key, or None if it is not cached.
+        """
+        path = self.path(key, suffix)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes, suffix: str = "") -> None:
+        """
+        Caches the contents for the key, evicting old entries to stay within max_bytes.
+        """
+        path = self.path(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def get_json(self, key: str) -> Any:
+        data = self.get(key, ".json")
+        return None if data is None else json.loads(data)
+
+    def put_json(self, key: str, value: Any) -> None:
+        self.put(key, json.dumps(value).encode("utf-8"), ".json")
+
+    def evict(self) -> None:
+        with self.lock:
+            directory = os.path.join(self.cache_dir, self.name)
+            entries = []
+            for entry in os.scandir(directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
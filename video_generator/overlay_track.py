@@ -0,0 +1,150 @@
+import os
+import subprocess
+from typing import List, Optional, Tuple
+
+import numpy
+from PIL import Image
+
+from .compositor import CaptionTimeline, Overlay
+from .encoder import PRESETS, get_ffmpeg_binary
+
+
+def blend_rgba(canvas: numpy.ndarray, overlay: Overlay) -> None:
+    """
+    Composites an overlay over a float32 straight-alpha RGBA canvas in place,
+    clipping it to the canvas.
+    """
+    canvas_h, canvas_w = canvas.shape[:2]
+    h, w = overlay.alpha.shape[:2]
+
+    x0, y0 = max(overlay.x, 0), max(overlay.y, 0)
+    x1, y1 = min(overlay.x + w, canvas_w), min(overlay.y + h, canvas_h)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    src = (slice(y0 - overlay.y, y1 - overlay.y), slice(x0 - overlay.x, x1 - overlay.x))
+    src_a = overlay.alpha[src]
+    region = canvas[y0:y1, x0:x1]
+    dst_a = region[:, :, 3:]
+
+    out_a = src_a + dst_a * (1 - src_a)
+    safe_a = numpy.where(out_a > 0, out_a, 1)
+    region[:, :, :3] = (
+        overlay.rgb[src] * src_a + region[:, :, :3] * dst_a * (1 - src_a)
+    ) / safe_a
+    region[:, :, 3:] = out_a
+
+
+def render_overlay_track(
+    overlays: List[Overlay],
+    frame_size: Tuple[int, int],
+    duration: float,
+    track_dir: str,
+) -> str:
+    """
+    Renders the overlays as a sparse, timed sequence of transparent PNGs.
+    One full-frame image is written per interval in which the set of active overlays
+    stays the same, and an ffconcat list with each image's duration is returned.
+    """
+    timeline = CaptionTimeline(overlays)
+    times = {0.0, duration}
+    for overlay in overlays:
+        times.update((overlay.start, overlay.end))
+    times = sorted(t for t in times if 0 <= t <= duration)
+
+    width, height = frame_size
+    empty_file = os.path.join(track_dir, "empty.png")
+    Image.new("RGBA", frame_size, (0, 0, 0, 0)).save(empty_file, compress_level=1)
+
+    entries: List[Tuple[str, float]] = []
+    for i, (start, end) in enumerate(zip(times, times[1:])):
+        active = timeline.active(start)
+        if not active:
+            entries.append((empty_file, end - start))
+            continue
+
+        canvas = numpy.zeros((height, width, 4), dtype=numpy.float32)
+        for overlay in active:
+            blend_rgba(canvas, overlay)
+        canvas[:, :, 3] *= 255
+
+        image_file = os.path.join(track_dir, f"{i:05d}.png")
+        image = Image.fromarray(canvas.round().astype(numpy.uint8), "RGBA")
+        image.save(image_file, compress_level=1)
+        entries.append((image_file, end - start))
+
+    list_file = os.path.join(track_dir, "track.ffconcat")
+    with open(list_file, "w", encoding="utf-8") as f:
+        f.write("ffconcat version 1.0\n")
+        for image_file, image_duration in entries:
+            f.write(f"file '{os.path.basename(image_file)}'\n")
+            f.write(f"duration {image_duration:.6f}\n")
+        # The last entry is repeated so its duration is honored
+        f.write(f"file '{os.path.basename(empty_file)}'\n")
+
+    return list_file
+
+
+def overlay_with_ffmpeg(
+    video_path: str,
+    duration: float,
+    fps: float,
+    track_file: str,
+    output_file: str,
+    audio_file: Optional[str] = None,
+    preset: str = "medium",
+    threads: Optional[int] = None,
+    audio_codec: str = "aac",
+    audio_bitrate: str = "192k",
+    video_start: float = 0.0,
+) -> None:
+    """
+    Composites an overlay track onto the background video, starting video_start seconds
+    into it, with a single ffmpeg overlay filter graph, muxing audio_file if given.
+    """
+    cmd = [
+        get_ffmpeg_binary(),
+        "-y",
+        "-loglevel",
+        "error",
+        "-ss",
+        f"{video_start:.6f}",
+        "-t",
+        f"{duration:.6f}",
+        "-i",
+        video_path,
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        track_file,
+    ]
+    if audio_file is not None:
+        cmd += ["-i", audio_file]
+    cmd += [
+        "-filter_complex",
+        "[0:v][1:v]overlay=eof_action=repeat:format=auto[v]",
+        "-map",
+        "[v]",
+    ]
+    if audio_file is not None:
+        cmd += ["-map", "2:a:0", "-c:a", audio_codec, "-b:a", audio_bitrate]
+    cmd += [
+        "-c:v",
+        "libx264",
+        "-preset",
+        PRESETS.get(preset, preset),
+        "-pix_fmt",
+        "yuv420p",
+        "-r",
+        f"{fps:.02f}",
+    ]
+    if threads is not None:
+        cmd += ["-threads", str(threads)]
+    cmd += [output_file]
+
+    result = subprocess.run(cmd, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="replace")
+        raise IOError(f"ffmpeg failed to write {output_file}:\n{stderr}")
@@ -0,0 +1,82 @@
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .encoder import get_ffmpeg_binary
+
+
+def split_frames(
+    frame_count: int, segment_count: int, gop_size: int
+) -> List[Tuple[int, int]]:
+    """
+    Splits frames [0, frame_count) into up to segment_count contiguous [first, last) ranges.
+    Boundaries fall on multiples of gop_size, so every segment starts on a keyframe of
+    the regular keyframe cadence and the segments can be joined without re-encoding.
+    """
+    gop_count = max(-(-frame_count // gop_size), 1)
+    segment_count = max(min(segment_count, gop_count), 1)
+
+    ranges = []
+    for i in range(segment_count):
+        first = gop_count * i // segment_count * gop_size
+        last = min(gop_count * (i + 1) // segment_count * gop_size, frame_count)
+        if first < last:
+            ranges.append((first, last))
+    return ranges
+
+
+def render_segments(
+    worker: Callable[[Dict[str, Any]], str],
+    jobs: List[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+) -> List[str]:
+    """
+    Runs one job per segment in a process pool and returns the segment files in order.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(worker, jobs))
+
+
+def concat_segments(
+    segment_files: List[str],
+    output_file: str,
+    audio_file: Optional[str] = None,
+    audio_codec: str = "aac",
+    audio_bitrate: str = "192k",
+) -> None:
+    """
+    Joins video segments with ffmpeg's concat demuxer without re-encoding them,
+    muxing audio_file as AAC if given.
+    """
+    list_file = output_file + ".segments.txt"
+    with open(list_file, "w", encoding="utf-8") as f:
+        for segment_file in segment_files:
+            path = os.path.abspath(segment_file).replace("'", "'\\''")
+            f.write(f"file '{path}'\n")
+
+    cmd = [
+        get_ffmpeg_binary(),
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        list_file,
+    ]
+    if audio_file is not None:
+        cmd += ["-i", audio_file, "-map", "0:v:0", "-map", "1:a:0"]
+        cmd += ["-c:a", audio_codec, "-b:a", audio_bitrate]
+    cmd += ["-c:v", "copy", output_file]
+
+    try:
+        result = subprocess.run(cmd, stderr=subprocess.PIPE)
+    finally:
+        os.remove(list_file)
+
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="replace")
+        raise IOError(f"ffmpeg failed to join segments into {output_file}:\n{stderr}")
@@ -0,0 +1,231 @@
+import hashlib
+import os
+import sys
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import numpy
+
+# Default location of the on-disk tier
+CACHE_DIR: str = os.path.join(os.path.dirname(__file__), "out", "render_cache")
+# Set to 1 to keep rendered arrays on disk in CACHE_DIR, or to a directory to keep
+# them there, so they survive restarts. Render workers inherit it from the environment
+RENDER_DISK_CACHE = os.environ.get("RENDER_DISK_CACHE", "")
+# Size each cache's on-disk tier is kept within
+RENDER_DISK_CACHE_MAX_BYTES = int(
+    os.environ.get("RENDER_DISK_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+)
+
+
+def disk_cache_dir(setting: str = RENDER_DISK_CACHE) -> Optional[str]:
+    """
+    Returns the on-disk tier's directory for a RENDER_DISK_CACHE setting, or None if
+    it is disabled.
+    """
+    if setting.lower() in ("", "0", "false", "no", "off"):
+        return None
+    if setting.lower() in ("1", "true", "yes", "on"):
+        return CACHE_DIR
+    return setting
+
+
+def sizeof(value: Any) -> int:
+    """
+    Returns the approximate size of a cached value in bytes.
+    """
+    if isinstance(value, numpy.ndarray):
+        return value.nbytes
+    return sys.getsizeof(value)
+
+
+class RenderCache:
+    """
+    LRU cache bounded by the total size of its values in bytes.
+    Values are stored under their full argument tuple, so different arguments can never
+    return each other's value. NumPy array values can also be kept in an on-disk tier
+    of .npz files named by the SHA-256 of the key, so they survive restarts. The disk
+    tier is bounded by disk_max_bytes, evicting the least recently used files like
+    MediaCache; loading a file refreshes its modification time.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_bytes: int,
+        sizeof: Callable[[Any], int] = sizeof,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = RENDER_DISK_CACHE_MAX_BYTES,
+    ):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        # Size of the disk tier, counted on the first save and tracked from then on
+        self.disk_bytes: Optional[int] = None
+        self.disk_evictions = 0
+        self.entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self.sizes: Dict[Hashable, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Returns the cached value for the key, or None if it is not cached.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        value = self.load(key)
+        if value is not None:
+            self.disk_hits += 1
+            self.store(key, value)
+            return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Caches a value, evicting the least recently used entries to stay within max_bytes.
+        """
+        self.store(key, value)
+        self.save(key, value)
+
+    def store(self, key: Hashable, value: Any) -> None:
+        if key in self.entries:
+            self.bytes -= self.sizes.pop(key)
+            del self.entries[key]
+
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        self.entries[key] = value
+        self.sizes[key] = size
+        self.bytes += size
+
+        while self.bytes > self.max_bytes:
+            evicted, _ = self.entries.popitem(last=False)
+            self.bytes -= self.sizes.pop(evicted)
+            self.evictions += 1
+
+    def disk_path(self, key: Hashable) -> str:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, self.name, f"{digest}.npz")
+
+    def load(self, key: Hashable) -> Optional[numpy.ndarray]:
+        if self.disk_dir is None:
+            return None
+
+        path = self.disk_path(key)
+        try:
+            with numpy.load(path) as data:
+                # Guard against digest collisions by comparing the stored key
+                if str(data["key"]) != repr(key):
+                    return None
+                value = data["value"]
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return value
+
+    def save(self, key: Hashable, value: Any) -> None:
+        if self.disk_dir is None or not isinstance(value, numpy.ndarray):
+            return
+
+        path = self.disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per writer, as render workers in other processes share the directory
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp.npz"
+        numpy.savez(temp_path, key=repr(key), value=value)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+
+        if self.disk_bytes is None:
+            self.evict_disk()
+        else:
+            self.disk_bytes += size
+            if self.disk_bytes > self.disk_max_bytes:
+                self.evict_disk()
+
+    def evict_disk(self) -> None:
+        """
+        Counts the size of the on-disk tier, which other processes may have written to,
+        and removes the least recently used files until it is within disk_max_bytes.
+        """
+        entries = []
+        for entry in os.scandir(os.path.join(self.disk_dir, self.name)):
+            if entry.is_file() and not entry.name.endswith(".tmp.npz"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.disk_evictions += 1
+        self.disk_bytes = total
+
+    def clear(self) -> None:
+        """
+        Drops all in-memory entries. The on-disk tier is left in place.
+        """
+        self.entries.clear()
+        self.sizes.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+        }
+
+
+caches: List[RenderCache] = []
+
+
+def create_cache(
+    name: str, max_bytes: int, sizeof: Callable[[Any], int] = sizeof
+) -> RenderCache:
+    """
+    Creates a cache and registers it so it shows up in cache_stats and enable_disk_cache.
+    Its on-disk tier is enabled if RENDER_DISK_CACHE is set.
+    """
+    cache = RenderCache(name, max_bytes, sizeof, disk_cache_dir())
+    caches.append(cache)
+    return cache
+
+
+def enable_disk_cache(disk_dir: str = CACHE_DIR) -> None:
+    """
+    Enables the on-disk tier for all registered caches.
+    """
+    for cache in caches:
+        cache.disk_dir = disk_dir
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Returns the counters of all registered caches by name.
+    """
+    return {cache.name: cache.stats() for cache in caches}
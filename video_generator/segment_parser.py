@@ -1,4 +1,5 @@
-from typing import Callable
+import copy
+from typing import Any, Callable, Tuple
 
 
 def has_partial_sentence(text):
@@ -10,6 +11,59 @@ def has_partial_sentence(text):
     return False
 
 
+class TextFitter:
+    """
+    Adapts a plain `fit_function(text) -> bool` to the incremental interface
+    used by `parse`. The state is the accumulated caption text, so every call
+    still checks the whole caption.
+    """
+
+    def __init__(self, fit_function: Callable[[str], bool]):
+        self.fit_function = fit_function
+
+    def initial(self) -> str:
+        return ""
+
+    def extend(self, state: str, text: str) -> Tuple[str, bool]:
+        text = state + text
+        return text, self.fit_function(text)
+
+
+def get_fitter(fit_function: Callable) -> Any:
+    """
+    Returns fit_function itself if it supports incremental fitting, otherwise wraps it in a TextFitter.
+    Incremental fitters provide `initial()`, returning the state of an empty caption, and
+    `extend(state, text)`, returning the state after appending text and whether it still fits.
+    """
+    if hasattr(fit_function, "initial") and hasattr(fit_function, "extend"):
+        return fit_function
+    return TextFitter(fit_function)
+
+
+def merge_words(words: list) -> list:
+    """
+    Merges words that are not separated by spaces into the preceding word.
+    The input words are left untouched, merged words are copies.
+    """
+    merged = []
+    for word in words:
+        if merged and not word.word.startswith(" "):
+            prev = copy.copy(merged[-1])
+            prev.word += word.word
+            prev.end = word.end
+            merged[-1] = prev
+        else:
+            merged.append(word)
+    return merged
+
+
+def last_tokens(tail: Tuple[str, ...], text: str) -> Tuple[str, ...]:
+    """
+    Returns the last two whitespace separated tokens of a caption after appending text to it.
+    """
+    return (tail + tuple(text.split()))[-2:]
+
+
 def parse(
     segments: list[dict],
     fit_function: Callable,
@@ -23,29 +77,29 @@ def parse(
         "text": "",
     }
 
-    # Merge words that are not separated by spaces
-    for s, segment in enumerate(segments):
-        for w, word in enumerate(segment["words"]):
-            if w > 0 and word.word[0] != " ":
-                segments[s]["words"][w - 1]["word"] += word.word
-                segments[s]["words"][w - 1]["end"] = word.end
-                del segments[s]["words"][w]
+    fitter = get_fitter(fit_function)
+    fit_state = fitter.initial()
+    tail: Tuple[str, ...] = ()
 
     # Parse segments into captions that fit on the video
     for segment in segments:
-        for word in segment["words"]:
+        for word in merge_words(segment["words"]):
             if caption["start"] is None:
                 caption["start"] = word.start
 
-            text = caption["text"] + word.word
-
-            caption_fits = allow_partial_sentences or not has_partial_sentence(text)
-            caption_fits = caption_fits and fit_function(text)
+            new_tail = last_tokens(tail, word.word)
+            caption_fits = allow_partial_sentences or not has_partial_sentence(
+                " ".join(new_tail)
+            )
+            if caption_fits:
+                new_state, caption_fits = fitter.extend(fit_state, word.word)
 
             if caption_fits:
                 caption["words"].append(word)
                 caption["end"] = word.end
-                caption["text"] = text
+                caption["text"] += word.word
+                fit_state = new_state
+                tail = new_tail
             else:
                 captions.append(caption)
                 caption = {
@@ -54,6 +108,8 @@ def parse(
                     "words": [word],
                     "text": word.word,
                 }
+                fit_state, _ = fitter.extend(fitter.initial(), word.word)
+                tail = last_tokens((), word.word)
 
     captions.append(caption)
 
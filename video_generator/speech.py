@@ -0,0 +1,160 @@
+import os
+import random
+import re
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List
+
+import openai
+
+from .audio_info import pcm_duration
+from .media_cache import MEDIA_CACHE_MAX_BYTES, MediaCache, content_key
+
+# The speech endpoint returns raw PCM as 24 kHz 16-bit mono little-endian samples
+SAMPLE_RATE = 24000
+SAMPLE_WIDTH = 2
+
+# The speech endpoint accepts up to 4096 characters per request
+MAX_CHUNK_CHARS = int(os.environ.get("TTS_MAX_CHUNK_CHARS", 600))
+MAX_CONCURRENCY = int(os.environ.get("TTS_MAX_CONCURRENCY", 4))
+MAX_RETRIES = int(os.environ.get("TTS_MAX_RETRIES", 4))
+RETRY_BACKOFF = 1.0
+
+# Synthesized PCM by (text, model, voice), so unchanged chunks are never billed twice
+pcm_cache = MediaCache("speech", MEDIA_CACHE_MAX_BYTES)
+
+# Errors worth retrying: rate limits, server errors, timeouts and dropped connections
+RETRY_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,
+)
+
+
+@dataclass
+class SpeechChunk:
+    """
+    A chunk of the transcript and its time span in the synthesized audio, in seconds.
+    """
+
+    text: str
+    start: float
+    end: float
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Splits text after sentence-ending punctuation.
+    """
+    return [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+
+
+def chunk_text(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
+    """
+    Groups the sentences of text into chunks of at most max_chars characters.
+    Sentences longer than max_chars are split between words.
+    """
+    pieces = []
+    for sentence in split_sentences(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars + 1)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            pieces.append(sentence)
+
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] += " " + piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def speech_key(transcript: str, model: str = "tts-1", voice: str = "echo") -> str:
+    """
+    Returns the content key of the speech for a transcript.
+    """
+    return content_key(transcript, model, voice)
+
+
+def synthesize_chunk(
+    client: openai.OpenAI,
+    text: str,
+    model: str = "tts-1",
+    voice: str = "echo",
+    max_retries: int = MAX_RETRIES,
+) -> bytes:
+    """
+    Synthesizes one chunk of text to raw PCM, retrying transient errors with
+    exponential backoff and jitter. Cached PCM is returned without calling the API.
+    """
+    if max_retries < 0:
+        raise ValueError(f"max_retries must be at least 0, got {max_retries}")
+
+    key = content_key(text, model, voice, SAMPLE_RATE)
+    pcm = pcm_cache.get(key, ".pcm")
+    if pcm is not None:
+        return pcm
+
+    for attempt in range(max_retries + 1):
+        try:
+            response = client.audio.speech.create(
+                model=model, voice=voice, input=text, response_format="pcm"
+            )
+            pcm_cache.put(key, response.content, ".pcm")
+            return response.content
+        except RETRY_ERRORS:
+            if attempt == max_retries:
+                raise
+            time.sleep(RETRY_BACKOFF * 2**attempt * random.uniform(0.5, 1.0))
+
+
+def synthesize(
+    client: openai.OpenAI,
+    transcript: str,
+    output_file: str,
+    model: str = "tts-1",
+    voice: str = "echo",
+    max_chars: int = MAX_CHUNK_CHARS,
+    max_concurrency: int = MAX_CONCURRENCY,
+) -> List[SpeechChunk]:
+    """
+    Synthesizes a transcript to a WAV file. The transcript is split at sentence boundaries
+    into chunks that are synthesized concurrently, and their audio is appended to the file
+    in order as soon as it is ready. Returns the time span of every chunk.
+    """
+    texts = chunk_text(transcript, max_chars)
+    chunks = []
+    byte_count = 0
+    temp_file = output_file + ".tmp.wav"
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            with wave.open(temp_file, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(SAMPLE_WIDTH)
+                wav.setframerate(SAMPLE_RATE)
+
+                pcm_chunks = executor.map(
+                    lambda text: synthesize_chunk(client, text, model, voice), texts
+                )
+                for text, pcm in zip(texts, pcm_chunks):
+                    pcm = pcm[: len(pcm) - len(pcm) % SAMPLE_WIDTH]
+                    wav.writeframes(pcm)
+                    start = pcm_duration(byte_count, SAMPLE_RATE, 1, SAMPLE_WIDTH)
+                    byte_count += len(pcm)
+                    end = pcm_duration(byte_count, SAMPLE_RATE, 1, SAMPLE_WIDTH)
+                    chunks.append(SpeechChunk(text, start, end))
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+    os.replace(temp_file, output_file)
+    return chunks
@@ -1,9 +1,11 @@
-from moviepy.editor import TextClip, ImageClip, VideoClip, CompositeVideoClip
-from PIL import Image, ImageFilter, ImageFont
+from moviepy.editor import ImageClip, VideoClip
 import numpy
-import tempfile
 
-text_cache = {}
+from .glyph_atlas import get_atlas
+from .render_cache import create_cache
+from .text_metrics import get_measurer
+
+text_cache = create_cache("text", 64 * 1024 * 1024)
 
 
 class Character:
@@ -30,55 +32,75 @@ class Word:
             char.set_color(color)
 
 
-class TextClipEx(TextClip):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.text = kwargs["txt"]
+def clip_to_rgba(clip) -> numpy.ndarray:
+    """
+    Returns the first frame of a clip, with its mask as the alpha channel, as a float32 RGBA array.
+    """
+    frame = clip.get_frame(0).astype(numpy.float32)
+    if clip.mask is not None:
+        alpha = clip.mask.get_frame(0).astype(numpy.float32) * 255
+    else:
+        alpha = numpy.full(frame.shape[:2], 255, dtype=numpy.float32)
+    return numpy.dstack([frame, alpha])
+
+
+def gaussian_kernel(radius: float) -> numpy.ndarray:
+    """
+    Returns a normalized 1D Gaussian kernel with a standard deviation of `radius`,
+    truncated at three standard deviations, as Pillow's GaussianBlur uses.
+    """
+    size = max(int(numpy.ceil(radius * 3)), 1)
+    x = numpy.arange(-size, size + 1, dtype=numpy.float32)
+    kernel = numpy.exp(-(x**2) / (2 * radius**2))
+    return kernel / kernel.sum()
+
+
+def gaussian_blur(image: numpy.ndarray, radius: float) -> numpy.ndarray:
+    """
+    Blurs a float32 (h, w, channels) array with a separable Gaussian kernel,
+    one vectorized pass along each axis. Pixels outside the image count as zero.
+    """
+    kernel = gaussian_kernel(radius)
+    size = len(kernel) // 2
+    h, w = image.shape[:2]
 
+    padded = numpy.pad(image, ((0, 0), (size, size), (0, 0)))
+    rows = numpy.zeros_like(image)
+    for i, weight in enumerate(kernel):
+        rows += padded[:, i : i + w] * weight
 
-def moviepy_to_pillow(clip) -> Image:
-    temp_file = tempfile.NamedTemporaryFile(suffix=".png").name
-    clip.save_frame(temp_file)
-    image = Image.open(temp_file)
-    return image
+    padded = numpy.pad(rows, ((size, size), (0, 0), (0, 0)))
+    blurred = numpy.zeros_like(image)
+    for i, weight in enumerate(kernel):
+        blurred += padded[i : i + h] * weight
+
+    return blurred
 
 
 def get_text_size(text, fontsize, font, stroke_width):
-    text_clip = create_text(
-        text, fontsize=fontsize, color="white", font=font, stroke_width=stroke_width
-    )
-    return text_clip.size
+    return get_measurer(font, fontsize, stroke_width, stroked=False).measure(text)
 
 
 def get_text_size_ex(text, font, fontsize, stroke_width):
-    text_clip = create_text_ex(
-        text, fontsize=fontsize, color="white", font=font, stroke_width=stroke_width
-    )
-    return text_clip.size
+    return get_measurer(font, fontsize, stroke_width, stroked=False).measure(text)
 
 
 def blur_text_clip(text_clip, blur_radius: int) -> VideoClip:
-    # Convert TextClip to a PIL image
-    pil_img = moviepy_to_pillow(text_clip)
+    rgba = clip_to_rgba(text_clip)
+    h, w = rgba.shape[:2]
 
     # Offset blur to make it centered
     offset = int(blur_radius * 0.6)
 
     # Add empty space around text for blur
-    pil_img_padded = Image.new(
-        "RGBA", (pil_img.width + blur_radius * 3, pil_img.height + blur_radius * 3)
-    )
-    pil_img_padded.paste(
-        moviepy_to_pillow(text_clip), (blur_radius + offset, blur_radius + offset)
-    )
+    padded = numpy.zeros((h + blur_radius * 3, w + blur_radius * 3, 4), numpy.float32)
+    left = blur_radius + offset
+    padded[left : left + h, left : left + w] = rgba
 
     # Create a blurred version of the text
-    pil_img_padded = pil_img_padded.filter(ImageFilter.GaussianBlur(radius=blur_radius))
-
-    text_clip = ImageClip(numpy.array(pil_img_padded))
-    text_clip = text_clip.set_duration(text_clip.duration)
+    blurred = gaussian_blur(padded, blur_radius)
 
-    return text_clip
+    return ImageClip(blurred.round().astype(numpy.uint8), transparent=True)
 
 
 def create_text(
@@ -93,110 +115,108 @@ def create_text(
     stroke_width: int = 1,
     kerning: float = 0.0,
 ) -> VideoClip:
-    global text_cache
-
-    arg_hash = hash(
-        (
-            text,
-            fontsize,
-            color,
-            font,
-            bg_color,
-            blur_radius,
-            opacity,
-            stroke_color,
-            stroke_width,
-            kerning,
-        )
+    key = (
+        text,
+        fontsize,
+        color,
+        font,
+        bg_color,
+        blur_radius,
+        opacity,
+        stroke_color,
+        stroke_width,
+        kerning,
     )
 
-    if arg_hash in text_cache:
-        return text_cache[arg_hash].copy()
-
-    text_clip = TextClipEx(
-        txt=text,
-        fontsize=fontsize,
-        color=color,
-        bg_color=bg_color,
-        font=font,
-        stroke_color=stroke_color,
-        stroke_width=stroke_width,
-        kerning=kerning,
-    )
+    frame = text_cache.get(key)
+    if frame is not None:
+        return ImageClip(frame, transparent=True)
 
-    text_clip = text_clip.set_opacity(opacity)
+    text_clip = render_chars(
+        [(char, color) for char in text],
+        fontsize,
+        font,
+        bg_color,
+        opacity,
+        stroke_color,
+        stroke_width,
+        kerning,
+    )
 
     if blur_radius:
         text_clip = blur_text_clip(text_clip, blur_radius)
 
-    text_cache[arg_hash] = text_clip.copy()
+    text_cache.put(key, clip_to_rgba(text_clip).round().astype(numpy.uint8))
 
     return text_clip
 
 
-def create_text_chars(
+def render_chars(
+    chars: list[tuple[str, str]],
+    fontsize: int,
+    font: str,
+    bg_color: str = "transparent",
+    opacity: float = 1.0,
+    stroke_color: str | None = None,
+    stroke_width: int = 1,
+    kerning: float = 0.0,
+) -> ImageClip:
+    atlas = get_atlas(font, fontsize, stroke_width)
+    frame = atlas.render_line(chars, stroke_color, bg_color, opacity, kerning)
+    return ImageClip(frame, transparent=True)
+
+
+def to_char_colors(
     text: list[Word] | list[Character],
-    fontsize,
-    color,
-    font,
-    bg_color="transparent",
-    blur_radius: int = 0,
-    opacity=1,
-    stroke_color=None,
-    stroke_width=1,
-    add_space_between_words=True,
-) -> list[VideoClip]:
-    # Create a clip for each character
-    clips = []
+    color: str,
+    add_space_between_words: bool = True,
+) -> list[tuple[str, str]]:
+    chars = []
     for i, item in enumerate(text):
         if isinstance(item, Word):
-            chars = item.characters
+            chars.extend((char.text, char.color or color) for char in item.characters)
             if add_space_between_words and i < len(text) - 1:
-                chars.append(Character(" ", item.color))
+                chars.append((" ", item.color or color))
         else:
-            chars = [item]
-
-        for char in chars:
-            clip = create_text(
-                char.text,
-                fontsize,
-                char.color or color,
-                font,
-                bg_color,
-                blur_radius,
-                opacity,
-                stroke_color,
-                stroke_width,
-            )
-            clips.append(clip)
-
-    return clips
-
-
-def create_composite_text(
-    text_clips: list[VideoClip], font, font_size
-) -> CompositeVideoClip:
-    clips = []
+            chars.append((item.text, item.color or color))
+    return chars
 
-    font = ImageFont.truetype(font, font_size)
-    scale_factor = 3.012  # factor to convert Pillow to MoviePy width
 
-    full_width = 0
-    for clip in text_clips[:-1]:
-        width = font.getlength(clip.text) * scale_factor
-        full_width += width
-
-    full_width += text_clips[-1].size[0]
-    offset_x = 0
-
-    for clip in text_clips:
-        clip.size = (int(full_width), clip.size[1])
-        clip = clip.set_position((int(offset_x), 0))
-        width = font.getlength(clip.text)
-        offset_x += width * scale_factor
-        clips.append(clip)
-
-    return CompositeVideoClip(clips)
+def render_word_highlights(
+    words: list[str],
+    fontsize: int,
+    color: str,
+    highlight_color: str,
+    font: str,
+    stroke_color: str | None = None,
+    stroke_width: int = 1,
+    highlight: bool = True,
+) -> tuple[numpy.ndarray, list[tuple[int, numpy.ndarray]]]:
+    """
+    Renders a line of words once in `color` and, for each word, only the columns that
+    change when that word is drawn in `highlight_color`.
+    Returns the base RGBA array and an (x offset, RGBA array) patch per word. Pasting a
+    patch over the base gives exactly what create_text_ex draws with that word highlighted.
+    With highlight=False, only the base is rendered and no patches are returned.
+    """
+    atlas = get_atlas(font, fontsize, stroke_width)
+    word_objs = [Word(w) for w in words]
+    base = atlas.render_line(to_char_colors(word_objs, color), stroke_color)
+
+    highlights = []
+    if not highlight:
+        return base, highlights
+    start = 0
+    for i, word in enumerate(word_objs):
+        # The highlighted run includes the space after the word, which takes its color
+        stop = start + len(word.characters) + (1 if i < len(word_objs) - 1 else 0)
+        word.set_color(highlight_color)
+        chars = to_char_colors(word_objs, color)
+        highlights.append(atlas.render_region(chars, start, stop, stroke_color))
+        word.set_color(None)
+        start = stop
+
+    return base, highlights
 
 
 def str_to_charlist(text: str) -> list[Character]:
@@ -214,18 +234,21 @@ def create_text_ex(
     stroke_color=None,
     stroke_width=1,
     kerning=0,
-) -> CompositeVideoClip:
+) -> ImageClip:
     if isinstance(text, str):
         text = str_to_charlist(text)
-    text_clips = create_text_chars(
-        text,
+    text_clip = render_chars(
+        to_char_colors(text, color),
         fontsize,
-        color,
         font,
         bg_color,
-        blur_radius,
         opacity,
         stroke_color,
         stroke_width,
+        kerning,
     )
-    return create_composite_text(text_clips, font, fontsize // 3)
+
+    if blur_radius:
+        text_clip = blur_text_clip(text_clip, blur_radius)
+
+    return text_clip
@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from .glyph_atlas import CharMetrics, get_atlas
+
+
+@dataclass(frozen=True)
+class LineExtents:
+    """
+    Pen position and extents of a partially laid out line.
+    Matches the canvas bounds GlyphAtlas.render_line computes for the same characters.
+    """
+
+    pen: float = 0.0
+    x0: int = 0
+    x1: int = 0
+    top: int = 0
+    bottom: int = 0
+
+    @property
+    def width(self) -> int:
+        return self.x1 - self.x0
+
+    @property
+    def height(self) -> int:
+        return self.bottom - self.top
+
+
+class TextMeasurer:
+    """
+    Measures text from font metrics alone, without rendering anything.
+    Per-word character metrics are cached, so extending a line by one word costs
+    only the length of that word.
+    """
+
+    def __init__(
+        self, font: str, fontsize: int, stroke_width: int, stroked: bool = True
+    ):
+        self.atlas = get_atlas(font, fontsize, stroke_width)
+        self.stroked = stroked
+        self.space = self.atlas.get_metrics(" ", stroked)
+        self.empty = LineExtents(top=self.atlas.top, bottom=self.atlas.bottom)
+        self.words: Dict[str, Tuple[CharMetrics, ...]] = {}
+
+    def word_metrics(self, word: str) -> Tuple[CharMetrics, ...]:
+        metrics = self.words.get(word)
+        if metrics is None:
+            metrics = tuple(self.atlas.get_metrics(c, self.stroked) for c in word)
+            self.words[word] = metrics
+        return metrics
+
+    @staticmethod
+    def advance(line: LineExtents, chars: Tuple[CharMetrics, ...]) -> LineExtents:
+        pen, x0, x1, top, bottom = line.pen, line.x0, line.x1, line.top, line.bottom
+        for char in chars:
+            x = int(pen)
+            x0 = min(x0, x - char.left)
+            x1 = max(x1, x + char.right)
+            top = min(top, char.top)
+            bottom = max(bottom, char.bottom)
+            pen += char.advance
+        return LineExtents(pen, x0, x1, top, bottom)
+
+    def extend(self, line: Optional[LineExtents], word: str) -> LineExtents:
+        """
+        Returns the extents of the line with a space and the word appended,
+        or of the word on its own when line is None.
+        """
+        if line is None:
+            return self.advance(self.empty, self.word_metrics(word))
+        return self.advance(self.advance(line, (self.space,)), self.word_metrics(word))
+
+    def wrap(
+        self, line: Optional[LineExtents], word: str, frame_width: int
+    ) -> Tuple[Optional[LineExtents], int]:
+        """
+        Greedily places a word after a partial line.
+        Returns the new partial line and how many lines were completed by placing it.
+        A word too wide for the frame on its own completes a line by itself and
+        leaves no partial line behind.
+        """
+        extended = self.extend(line, word)
+        if extended.width < frame_width:
+            return extended, 0
+
+        completed = 0
+        if line is not None:
+            completed = 1
+            extended = self.extend(None, word)
+            if extended.width < frame_width:
+                return extended, completed
+
+        return None, completed + 1
+
+    def measure(self, text: str) -> Tuple[int, int]:
+        """
+        Returns the (width, height) of the given text as it would be rendered.
+        """
+        line = self.advance(
+            self.empty, tuple(self.atlas.get_metrics(c, self.stroked) for c in text)
+        )
+        return line.width, line.height
+
+
+measurers: Dict[Tuple[str, int, int, bool], TextMeasurer] = {}
+
+
+def get_measurer(
+    font: str, fontsize: int, stroke_width: int, stroked: bool = True
+) -> TextMeasurer:
+    """
+    Returns the shared measurer for a font, size and stroke width.
+    """
+    key = (font, fontsize, stroke_width, stroked)
+    measurer = measurers.get(key)
+    if measurer is None:
+        measurer = TextMeasurer(font, fontsize, stroke_width, stroked)
+        measurers[key] = measurer
+    return measurer
@@ -2,6 +2,9 @@ from openai import AzureOpenAI
 from openai._types import FileTypes
 import os
 
+from .aligner import AlignedWord
+from .media_cache import MediaCache, content_key, file_digest
+
 client = AzureOpenAI(
     azure_deployment="whisper",
     api_version="2024-06-01",
@@ -9,11 +12,25 @@ client = AzureOpenAI(
     api_key=os.environ["AZURE_OPENAI_WHISPER_API_KEY"],
 )
 
+# Word timings by audio content and prompt
+transcript_cache = MediaCache("transcripts", 64 * 1024 * 1024)
+
 
 def transcribe_with_api(audio_file: FileTypes, prompt: str | None = None):
     """
-    Transcribe an audio file using the OpenAI Whisper API
+    Transcribe an audio file using the OpenAI Whisper API.
+    Results are cached by the audio's contents, so the same audio is only transcribed once.
     """
+    key = content_key(file_digest(audio_file), prompt)
+    cached = transcript_cache.get_json(key)
+    if cached is not None:
+        return [
+            {
+                "start": cached["start"],
+                "end": cached["end"],
+                "words": [AlignedWord(**word) for word in cached["words"]],
+            }
+        ]
 
     transcript = client.audio.transcriptions.create(
         model="whisper",
@@ -25,8 +42,18 @@ def transcribe_with_api(audio_file: FileTypes, prompt: str | None = None):
 
     # Add space to beginning of words
     # to match local Whisper format
-    for transcription_word in transcript.words:
-        transcription_word.word = " " + transcription_word.word
+    words = [
+        AlignedWord(word=" " + word.word, start=word.start, end=word.end)
+        for word in transcript.words
+    ]
+    transcript_cache.put_json(
+        key,
+        {
+            "start": transcript.segments[0].start,
+            "end": transcript.segments[-1].end,
+            "words": [vars(word) for word in words],
+        },
+    )
 
     # Return response in same format
     # as local Whisper format
@@ -34,6 +61,6 @@ def transcribe_with_api(audio_file: FileTypes, prompt: str | None = None):
         {
             "start": transcript.segments[0].start,
             "end": transcript.segments[-1].end,
-            "words": transcript.words,
+            "words": words,
         }
     ]
@@ -1,28 +1,62 @@
 import os
+import shutil
 import subprocess
+import sys
 import time
-from typing import Any, Callable, Dict, List, Optional, Union
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from moviepy.editor import VideoFileClip, CompositeVideoClip, AudioFileClip, ImageClip
+from moviepy.editor import VideoFileClip, ImageClip
 from openai import AzureOpenAI
-import librosa
+from PIL import Image
+import numpy
 
+from . import aligner
 from . import segment_parser
+from . import speech
 from . import transcriber
+from .audio_info import probe_audio
+from .background_library import get_background_library
+from .compositor import Overlay, composite, from_rgba, to_overlay
+from .encoder import FFmpegEncoder, encode_clip
+from .overlay_track import overlay_with_ffmpeg, render_overlay_track
+from .parallel import concat_segments, render_segments, split_frames
+from .render_cache import cache_stats, create_cache
+from .text_metrics import LineExtents, get_measurer
 from .text_drawer import (
-    get_text_size_ex,
     create_text_ex,
     blur_text_clip,
-    Word,
+    clip_to_rgba,
+    render_word_highlights,
 )
 
 # Output directory for generated files
 OUT_DIR: str = os.path.join(os.path.dirname(__file__), "out")
 os.makedirs(OUT_DIR, exist_ok=True)
 
+# Processes render_video splits the timeline of a file-backed video across
+RENDER_SEGMENT_WORKERS = int(os.environ.get("RENDER_SEGMENT_WORKERS", 1))
+# "python" composites every frame in Python, "ffmpeg" only renders the overlays
+RENDER_MODE = os.environ.get("RENDER_MODE", "python")
+# x264 preset of the rendered videos, or "preview"/"final" for ultrafast/slow
+RENDER_PRESET = os.environ.get("RENDER_PRESET", "medium")
+
+
+def lines_sizeof(data: Dict[str, Any]) -> int:
+    """
+    Returns the approximate size of a calculate_lines result in bytes.
+    """
+    return sys.getsizeof(data) + sum(
+        sys.getsizeof(line) + sys.getsizeof(line["text"]) for line in data["lines"]
+    )
+
+
+# A title image given as a file path, a PIL image or an RGB(A) uint8 array
+TitleImage = Union[str, Image.Image, numpy.ndarray]
+
 # Caches for performance
-shadow_cache: Dict[int, Any] = {}
-lines_cache: Dict[int, Any] = {}
+shadow_cache = create_cache("shadows", 256 * 1024 * 1024)
+lines_cache = create_cache("lines", 16 * 1024 * 1024, sizeof=lines_sizeof)
 
 # Azure OpenAI client for TTS
 client = AzureOpenAI(
@@ -40,18 +74,56 @@ def get_output_path(filename: str) -> str:
     return os.path.join(OUT_DIR, filename)
 
 
+class FrameFitter:
+    """
+    Checks if caption text fits within the specified frame constraints.
+    Besides being callable with the full text, it supports the incremental interface of
+    segment_parser.parse, keeping the partial line and line count as state so each
+    appended word is checked in constant time.
+    """
+
+    def __init__(
+        self,
+        line_count: int,
+        font: str,
+        font_size: int,
+        stroke_width: int,
+        frame_width: int,
+    ):
+        self.line_count = line_count
+        self.font = font
+        self.font_size = font_size
+        self.stroke_width = stroke_width
+        self.frame_width = frame_width
+        self.measurer = get_measurer(font, font_size, stroke_width)
+
+    def __call__(self, text: str) -> bool:
+        lines = calculate_lines(
+            text, self.font, self.font_size, self.stroke_width, self.frame_width
+        )
+        return len(lines["lines"]) <= self.line_count
+
+    def initial(self) -> Tuple[Optional[LineExtents], int]:
+        return None, 0
+
+    def extend(
+        self, state: Tuple[Optional[LineExtents], int], text: str
+    ) -> Tuple[Tuple[Optional[LineExtents], int], bool]:
+        line, count = state
+        for word in text.split():
+            line, completed = self.measurer.wrap(line, word, self.frame_width)
+            count += completed
+        fits = count + (line is not None) <= self.line_count
+        return (line, count), fits
+
+
 def fits_frame(
     line_count: int, font: str, font_size: int, stroke_width: int, frame_width: int
-) -> Callable[[str], bool]:
+) -> FrameFitter:
     """
     Returns a function that checks if a given text fits within the specified frame constraints.
     """
-
-    def fit_function(text: str) -> bool:
-        lines = calculate_lines(text, font, font_size, stroke_width, frame_width)
-        return len(lines["lines"]) <= line_count
-
-    return fit_function
+    return FrameFitter(line_count, font, font_size, stroke_width, frame_width)
 
 
 def calculate_lines(
@@ -59,55 +131,46 @@ def calculate_lines(
 ) -> Dict[str, Any]:
     """
     Splits text into lines that fit within the frame width, using caching for performance.
+    Widths come from font metrics, so wrapping is linear in the number of words.
     Returns a dict with 'lines' (list of line dicts) and 'height' (total height).
     """
-    global lines_cache
-    arg_hash = hash((text, font, font_size, stroke_width, frame_width))
-    if arg_hash in lines_cache:
-        return lines_cache[arg_hash]
+    key = (text, font, font_size, stroke_width, frame_width)
+    data = lines_cache.get(key)
+    if data is not None:
+        return data
 
+    measurer = get_measurer(font, font_size, stroke_width)
     lines: List[Dict[str, Any]] = []
-    line_to_draw: Optional[Dict[str, Any]] = None
-    line = ""
-    words = text.split()
-    word_index = 0
+    line: Optional[LineExtents] = None
+    line_words: List[str] = []
     total_height = 0
-    while word_index < len(words):
-        word = words[word_index]
-        line += word + " "
-        text_size = get_text_size_ex(line.strip(), font, font_size, stroke_width)
-        text_width = text_size[0]
-        line_height = text_size[1]
-
-        if text_width < frame_width:
-            line_to_draw = {
-                "text": line.strip(),
-                "height": line_height,
-            }
-            word_index += 1
+
+    for word in text.split():
+        new_line, completed = measurer.wrap(line, word, frame_width)
+        if completed and line is not None:
+            lines.append({"text": " ".join(line_words), "height": line.height})
+            total_height += line.height
+            line_words = []
+            completed -= 1
+
+        if completed:
+            print(f"NOTICE: Word '{word}' is too long for the frame!")
+            height = measurer.extend(None, word).height
+            lines.append({"text": word, "height": height})
+            total_height += height
         else:
-            if not line_to_draw:
-                print(f"NOTICE: Word '{line.strip()}' is too long for the frame!")
-                line_to_draw = {
-                    "text": line.strip(),
-                    "height": line_height,
-                }
-                word_index += 1
-
-            lines.append(line_to_draw)
-            total_height += line_height
-            line_to_draw = None
-            line = ""
-
-    if line_to_draw:
-        lines.append(line_to_draw)
-        total_height += line_height
+            line_words.append(word)
+        line = new_line
+
+    if line is not None:
+        lines.append({"text": " ".join(line_words), "height": line.height})
+        total_height += line.height
 
     data = {
         "lines": lines,
         "height": total_height,
     }
-    lines_cache[arg_hash] = data
+    lines_cache.put(key, data)
     return data
 
 
@@ -117,14 +180,14 @@ def create_shadow(
     """
     Creates a blurred shadow text clip for overlay, using caching for performance.
     """
-    global shadow_cache
-    arg_hash = hash((text, font_size, font, blur_radius, opacity))
-    if arg_hash in shadow_cache:
-        return shadow_cache[arg_hash].copy()
+    key = (text, font_size, font, blur_radius, opacity)
+    frame = shadow_cache.get(key)
+    if frame is not None:
+        return ImageClip(frame, transparent=True)
 
     shadow = create_text_ex(text, font_size, "black", font, opacity=opacity)
     shadow = blur_text_clip(shadow, int(font_size * blur_radius))
-    shadow_cache[arg_hash] = shadow.copy()
+    shadow_cache.put(key, clip_to_rgba(shadow).round().astype(numpy.uint8))
     return shadow
 
 
@@ -156,10 +219,236 @@ def get_video_path(video_name: str) -> str:
     return video_path
 
 
+def build_overlays(
+    captions: List[Dict[str, Any]],
+    frame_size: Tuple[int, int],
+    font: str,
+    font_size: int,
+    font_color: str,
+    stroke_width: int,
+    stroke_color: str,
+    highlight_current_word: bool,
+    word_highlight_color: str,
+    text_bbox_width: int,
+    shadow_strength: float,
+    shadow_blur: float,
+    time_range: Optional[Tuple[float, float]] = None,
+) -> List[Overlay]:
+    """
+    Renders the shadow and text overlays of parsed captions, in drawing order.
+    If time_range is given, only captions visible in [start, end) are rendered.
+    """
+    overlays: List[Overlay] = []
+    shadow_overlays: Dict[Tuple[str, float, Tuple[str, int]], Overlay] = {}
+
+    for caption in captions:
+        if time_range is not None and (
+            caption["end"] <= time_range[0] or caption["start"] >= time_range[1]
+        ):
+            continue
+
+        captions_to_draw = []
+        if highlight_current_word:
+            for i, word in enumerate(caption["words"]):
+                if i + 1 < len(caption["words"]):
+                    end = caption["words"][i + 1].start
+                else:
+                    end = word.end
+                captions_to_draw.append(
+                    {
+                        "text": caption["text"],
+                        "start": word.start,
+                        "end": end,
+                    }
+                )
+        else:
+            captions_to_draw.append(caption)
+
+        line_data = calculate_lines(
+            caption["text"], font, font_size, stroke_width, text_bbox_width
+        )
+        text_y_offset = frame_size[1] // 2 - line_data["height"] // 2
+        line_start_index = 0
+        for line in line_data["lines"]:
+            pos = ("center", text_y_offset)
+            words = line["text"].split()
+
+            # Draw the line once, plus the columns each highlighted word changes
+            base, highlights = render_word_highlights(
+                words,
+                font_size,
+                font_color,
+                word_highlight_color,
+                font,
+                stroke_color=stroke_color,
+                stroke_width=stroke_width,
+                highlight=highlight_current_word,
+            )
+            text_overlay = from_rgba(base, 0, 0, pos, frame_size)
+
+            for current_index, caption_state in enumerate(captions_to_draw):
+                start, end = caption_state["start"], caption_state["end"]
+
+                # Create shadow, blurred once per line and reused by every highlight state
+                shadow_left = shadow_strength
+                while shadow_left > 0:
+                    opacity = min(shadow_left, 1)
+                    shadow_left -= 1
+                    key = (line["text"], opacity, pos)
+                    if key not in shadow_overlays:
+                        shadow = create_shadow(
+                            line["text"], font_size, font, shadow_blur, opacity=opacity
+                        )
+                        shadow_overlays[key] = to_overlay(
+                            shadow, start, end, pos, frame_size
+                        )
+                    overlays.append(shadow_overlays[key].retimed(start, end))
+
+                # Create text, splitting the line around the highlighted word
+                word_index = current_index - line_start_index
+                if highlight_current_word and 0 <= word_index < len(words):
+                    x, patch = highlights[word_index]
+                    x_end = x + patch.shape[1]
+                    patch_overlay = from_rgba(patch, start, end, (0, 0), frame_size)
+                    patch_overlay.x = text_overlay.x + x
+                    patch_overlay.y = text_overlay.y
+                    overlays.append(text_overlay.cropped(0, x).retimed(start, end))
+                    overlays.append(patch_overlay)
+                    overlays.append(
+                        text_overlay.cropped(x_end, base.shape[1]).retimed(start, end)
+                    )
+                else:
+                    overlays.append(text_overlay.retimed(start, end))
+
+            line_start_index += len(words)
+            text_y_offset += line["height"]
+
+    return overlays
+
+
+def title_overlay(img_file: TitleImage, frame_size: Tuple[int, int]) -> Overlay:
+    """
+    Returns the overlay of the title image, centered and shown for the first 3 seconds.
+    The image can be a file path, a PIL image or an RGB(A) uint8 array.
+    """
+    if isinstance(img_file, str):
+        return to_overlay(ImageClip(img_file), 0, 3, ("center", "center"), frame_size)
+
+    if isinstance(img_file, Image.Image):
+        rgba = numpy.asarray(img_file.convert("RGBA"))
+    elif img_file.shape[2] == 3:
+        opaque = numpy.full(img_file.shape[:2], 255, dtype=numpy.uint8)
+        rgba = numpy.dstack([img_file, opaque])
+    else:
+        rgba = img_file
+    return from_rgba(rgba, 0, 3, ("center", "center"), frame_size)
+
+
+def source_file(video: VideoFileClip, video_start: float = 0.0) -> Optional[str]:
+    """
+    Returns the file the video can be re-read from, if it is an unmodified VideoFileClip
+    or a subclip of one starting video_start seconds into its file. Transformed clips,
+    like resized, cropped or filtered ones, keep their source's filename, so their size
+    and middle frame are checked against the file's. Clips that run past the end of the
+    file hold its last frame, which only the Python path does.
+    """
+    reader = getattr(video, "reader", None)
+    if not isinstance(video, VideoFileClip) or reader is None:
+        return None
+    if tuple(video.size) != tuple(reader.size):
+        return None
+    if video_start + video.duration > reader.duration:
+        return None
+    t = video.duration / 2
+    if not numpy.array_equal(video.get_frame(t), reader.get_frame(t + video_start)):
+        return None
+    return video.filename
+
+
+def render_segment(job: Dict[str, Any]) -> str:
+    """
+    Renders the captions over frames [first, last) of a video file into a video-only
+    segment file. Runs in a worker process of render_in_segments.
+    """
+    video = VideoFileClip(job["video_path"], audio=False)
+    if job["video_start"]:
+        video = video.subclip(job["video_start"])
+    fps = job["fps"]
+    first, last = job["frames"]
+    time_range = (first / fps, last / fps)
+
+    overlays = build_overlays(
+        job["captions"], video.size, time_range=time_range, **job["style"]
+    )
+    if job["img_file"] is not None:
+        overlays.append(title_overlay(job["img_file"], video.size))
+    clip = composite(video, overlays)
+
+    with FFmpegEncoder(
+        job["output_file"],
+        video.size,
+        fps,
+        preset=job["preset"],
+        threads=job["threads"],
+        extra_args=["-g", str(job["gop_size"])],
+    ) as encoder:
+        for frame_index in range(first, last):
+            encoder.write_frame(clip.get_frame(frame_index / fps))
+
+    video.close()
+    return job["output_file"]
+
+
+def render_in_segments(
+    video_path: str,
+    duration: float,
+    fps: float,
+    captions: List[Dict[str, Any]],
+    style: Dict[str, Any],
+    img_file: Optional[TitleImage],
+    audio_file: Optional[str],
+    output_file: str,
+    workers: int,
+    preset: str = "medium",
+    video_start: float = 0.0,
+) -> None:
+    """
+    Splits the timeline into keyframe-aligned frame ranges, renders each one in its own
+    process and joins the segments with the concat demuxer without re-encoding.
+    """
+    gop_size = max(int(round(fps * 2)), 1)
+    frame_count = len(numpy.arange(0, duration, 1.0 / fps))
+    segment_dir = get_output_path(f"segments_{uuid.uuid4()}")
+    os.makedirs(segment_dir)
+
+    jobs = [
+        {
+            "video_path": video_path,
+            "video_start": video_start,
+            "fps": fps,
+            "frames": frames,
+            "captions": captions,
+            "style": style,
+            "img_file": img_file,
+            "preset": preset,
+            "threads": 2,
+            "gop_size": gop_size,
+            "output_file": os.path.join(segment_dir, f"{i:04d}.mp4"),
+        }
+        for i, frames in enumerate(split_frames(frame_count, workers, gop_size))
+    ]
+
+    try:
+        segment_files = render_segments(render_segment, jobs, max_workers=workers)
+        concat_segments(segment_files, output_file, audio_file)
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+
 def add_captions(
     video: VideoFileClip,
     audio_file: Optional[str],
-    img_file: Optional[str],
+    img_file: Optional[TitleImage],
     output_file: Optional[str],
     font: str = "Bangers-Regular.ttf",
     font_size: int = 100,
@@ -176,9 +465,24 @@ def add_captions(
     print_info: bool = False,
     initial_prompt: Optional[str] = None,
     segments: Optional[Any] = None,
+    preset: str = "medium",
+    workers: int = 1,
+    render_mode: str = "python",
+    video_start: float = 0.0,
+    transcript: Optional[str] = None,
 ) -> None:
     """
     Adds animated captions and optional image overlay to a video, then writes the result to output_file.
+    The image can be a file path, or a PIL image or array rendered in memory.
+    If the transcript of the audio is known, its words are aligned to the audio locally
+    instead of transcribing the audio with Whisper.
+    The frames are streamed into ffmpeg with the given x264 preset, or "preview"/"final"
+    for ultrafast/slow. With workers > 1 and a file-backed video, the timeline is rendered
+    in that many segments in parallel processes.
+    With render_mode="ffmpeg" and a file-backed video, only the overlays are rendered, as a
+    sparse transparent image track, and ffmpeg composites them onto the background.
+    Both modes reopen the video's file, so video_start must give the offset of `video`
+    within it when it is a subclip. Transformed videos are rendered from their frames.
     """
     _start_time = time.time()
     font = get_font_path(font)
@@ -186,7 +490,11 @@ def add_captions(
     if print_info:
         print("Extracting audio...")
 
-    if segments is None:
+    if segments is None and transcript is not None:
+        if print_info:
+            print("Aligning transcript...")
+        segments = aligner.align(audio_file, transcript)
+    elif segments is None:
         if print_info:
             print("Transcribing audio...")
         segments = transcriber.transcribe_with_api(audio_file, initial_prompt)
@@ -195,7 +503,6 @@ def add_captions(
         print("Generating video elements...")
 
     text_bbox_width = video.w - padding * 2
-    clips: List[Any] = [video]
 
     captions = segment_parser.parse(
         segments=segments,
@@ -210,109 +517,115 @@ def add_captions(
         ),
     )
 
-    for caption in captions:
-        captions_to_draw = []
-        if highlight_current_word:
-            for i, word in enumerate(caption["words"]):
-                if i + 1 < len(caption["words"]):
-                    end = caption["words"][i + 1].start
-                else:
-                    end = word.end
-                captions_to_draw.append(
-                    {
-                        "text": caption["text"],
-                        "start": word.start,
-                        "end": end,
-                    }
-                )
-        else:
-            captions_to_draw.append(caption)
-
-        for current_index, caption in enumerate(captions_to_draw):
-            line_data = calculate_lines(
-                caption["text"], font, font_size, stroke_width, text_bbox_width
-            )
-            text_y_offset = video.h // 2 - line_data["height"] // 2
-            index = 0
-            for line in line_data["lines"]:
-                pos = ("center", text_y_offset)
-                words = line["text"].split()
-                word_list = []
-                for w in words:
-                    word_obj = Word(w)
-                    if highlight_current_word and index == current_index:
-                        word_obj.set_color(word_highlight_color)
-                    index += 1
-                    word_list.append(word_obj)
-
-                # Create shadow
-                shadow_left = shadow_strength
-                while shadow_left >= 1:
-                    shadow_left -= 1
-                    shadow = create_shadow(
-                        line["text"], font_size, font, shadow_blur, opacity=1
-                    )
-                    shadow = shadow.set_start(caption["start"])
-                    shadow = shadow.set_duration(caption["end"] - caption["start"])
-                    shadow = shadow.set_position(pos)
-                    clips.append(shadow)
-                if shadow_left > 0:
-                    shadow = create_shadow(
-                        line["text"], font_size, font, shadow_blur, opacity=shadow_left
-                    )
-                    shadow = shadow.set_start(caption["start"])
-                    shadow = shadow.set_duration(caption["end"] - caption["start"])
-                    shadow = shadow.set_position(pos)
-                    clips.append(shadow)
-
-                # Create text
-                text_clip = create_text_ex(
-                    word_list,
-                    font_size,
-                    font_color,
-                    font,
-                    stroke_color=stroke_color,
-                    stroke_width=stroke_width,
-                )
-                text_clip = text_clip.set_start(caption["start"])
-                text_clip = text_clip.set_duration(caption["end"] - caption["start"])
-                text_clip = text_clip.set_position(pos)
-                clips.append(text_clip)
-                text_y_offset += line["height"]
-
-    end_time = time.time()
-    generation_time = end_time - _start_time
-
-    if print_info:
-        print(
-            f"Generated in {generation_time // 60:02.0f}:{generation_time % 60:02.0f} ({len(clips)} clips)"
-        )
-        print("Rendering video...")
-
-    if img_file is not None:
-        image = ImageClip(img_file)
-        image = image.set_duration(3)
-        image = image.set_position(("center", "center"))
-        image = image.set_start(0)
-        clips.append(image)
-
-    video_with_text = CompositeVideoClip(clips)
-    if audio_file is not None:
-        audio_clip = AudioFileClip(audio_file)
-        video_with_text.audio = audio_clip
+    style = {
+        "font": font,
+        "font_size": font_size,
+        "font_color": font_color,
+        "stroke_width": stroke_width,
+        "stroke_color": stroke_color,
+        "highlight_current_word": highlight_current_word,
+        "word_highlight_color": word_highlight_color,
+        "text_bbox_width": text_bbox_width,
+        "shadow_strength": shadow_strength,
+        "shadow_blur": shadow_blur,
+    }
 
     if output_file is None:
         output_file = get_output_path("with_transcript.mp4")
 
-    video_with_text.write_videofile(
-        filename=output_file,
-        codec="libx264",
-        fps=video.fps,
-        logger="bar" if print_info else None,
-        remove_temp=True,
-        audio_codec="pcm_s32le",
-        threads=8,
-    )
+    if render_mode not in ("python", "ffmpeg"):
+        raise ValueError(f"Unknown render mode '{render_mode}'")
+
+    # Keep the background's own audio when no voiceover is given, in a file of this
+    # render's own, so concurrent renders don't overwrite each other's
+    background_audio = None
+    if audio_file is None and video.audio is not None:
+        background_audio = get_output_path(f"background_audio_{uuid.uuid4()}.wav")
+        video.audio.write_audiofile(background_audio, logger=None)
+        audio_file = background_audio
+
+    try:
+        video_path = None
+        if render_mode == "ffmpeg" or workers > 1:
+            video_path = source_file(video, video_start)
+            if video_path is None and print_info:
+                print("Video doesn't match its file, rendering it from its frames...")
+
+        if render_mode == "ffmpeg" and video_path is not None:
+            overlays = build_overlays(captions, video.size, **style)
+            if img_file is not None:
+                overlays.append(title_overlay(img_file, video.size))
+
+            track_dir = get_output_path(f"track_{uuid.uuid4()}")
+            os.makedirs(track_dir)
+            try:
+                track_file = render_overlay_track(
+                    overlays, video.size, video.duration, track_dir
+                )
+                generation_time = time.time() - _start_time
+                if print_info:
+                    print(
+                        f"Generated in {generation_time // 60:02.0f}:{generation_time % 60:02.0f} ({len(overlays)} overlays)"
+                    )
+                    print("Compositing video with ffmpeg...")
+
+                overlay_with_ffmpeg(
+                    video_path,
+                    video.duration,
+                    video.fps,
+                    track_file,
+                    output_file,
+                    audio_file=audio_file,
+                    preset=preset,
+                    threads=8,
+                    video_start=video_start,
+                )
+            finally:
+                shutil.rmtree(track_dir, ignore_errors=True)
+        elif workers > 1 and video_path is not None:
+            generation_time = time.time() - _start_time
+            if print_info:
+                print(f"Rendering video in {workers} segments...")
+
+            render_in_segments(
+                video_path,
+                video.duration,
+                video.fps,
+                captions,
+                style,
+                img_file,
+                audio_file,
+                output_file,
+                workers,
+                preset,
+                video_start,
+            )
+        else:
+            overlays = build_overlays(captions, video.size, **style)
+            if img_file is not None:
+                overlays.append(title_overlay(img_file, video.size))
+
+            generation_time = time.time() - _start_time
+            if print_info:
+                print(
+                    f"Generated in {generation_time // 60:02.0f}:{generation_time % 60:02.0f} ({len(overlays)} overlays)"
+                )
+                for name, stats in cache_stats().items():
+                    print(f"Cache {name}: {stats}")
+                print("Rendering video...")
+
+            encode_clip(
+                composite(video, overlays),
+                output_file,
+                fps=video.fps,
+                audio_file=audio_file,
+                preset=preset,
+                threads=8,
+                logger="bar" if print_info else None,
+            )
+    finally:
+        if background_audio is not None:
+            os.remove(background_audio)
 
     end_time = time.time()
     total_time = end_time - _start_time
@@ -323,41 +636,91 @@ def add_captions(
     print(f"Done in {total_time // 60:02.0f}:{total_time % 60:02.0f}")
 
 
-def generate_video_audio(transcript: str, audio_filename: str) -> float:
+def generate_video_audio(
+    transcript: str, audio_filename: str
+) -> List[speech.SpeechChunk]:
     """
-    Generates speech audio from transcript and saves it to the given filename.
-    Returns the duration of the audio in seconds.
+    Generates speech audio from transcript and saves it to the given filename as WAV.
+    Returns the time span of every synthesized chunk; the last one ends with the audio.
     """
     speech_file_path = get_output_path(audio_filename)
-    response = client.audio.speech.create(model="tts-1", voice="echo", input=transcript)
-    response.stream_to_file(speech_file_path)
-    return librosa.get_duration(path=speech_file_path)
+    return speech.synthesize(client, transcript, speech_file_path)
 
 
-def generate_video(img_file: Optional[str], transcript: str, post_title: str) -> None:
+def prepare_video(transcript: str, post_title: str) -> Dict[str, Any]:
     """
-    Generates a video with captions and optional image overlay, using the transcript and post title.
-    The audio file is named dynamically based on the post title.
+    Runs the I/O-bound steps of generate_video: synthesizes and aligns the speech, and picks
+    the background footage. Returns a picklable job for render_video.
+    The audio file is named by a hash of the transcript and voice, the video by the post title.
     """
     if not transcript.startswith(post_title):
         transcript = post_title + ". " + transcript
 
-    # Use a dynamic audio filename based on post_title
+    # Name the video by the post title
     safe_title = "".join(
         c for c in post_title if c.isalnum() or c in (" ", "_", "-")
     ).rstrip()
-    audio_filename = f"speech_{safe_title}.wav"
-    audio_duration = generate_video_audio(transcript, audio_filename)
-    video_duration = audio_duration + 0.5
+    # Name the audio by its content, so posts with the same title don't overwrite each other
+    audio_filename = f"speech_{speech.speech_key(transcript)[:16]}.wav"
+    speech_chunks = generate_video_audio(transcript, audio_filename)
+    audio_file = get_output_path(audio_filename)
+    video_duration = probe_audio(audio_file).duration + 0.5
 
-    base_clip = VideoFileClip(get_video_path("base.mp4"))
-    clip = base_clip.set_duration(video_duration)
+    background, video_start = get_background_library().choose(video_duration)
 
-    audio_file = get_output_path(audio_filename)
-    video_output_file = get_output_path(f"{safe_title}.mp4")
+    return {
+        "video_path": background.path,
+        "video_start": video_start,
+        "video_duration": video_duration,
+        "audio_file": audio_file,
+        "segments": aligner.align_chunks(audio_file, speech_chunks),
+        "output_file": get_output_path(f"{safe_title}.mp4"),
+    }
+
+
+def render_video(
+    job: Dict[str, Any],
+    img_file: Optional[TitleImage] = None,
+    workers: int = RENDER_SEGMENT_WORKERS,
+    render_mode: str = RENDER_MODE,
+    preset: str = RENDER_PRESET,
+) -> str:
+    """
+    Renders a job from prepare_video with an optional title image and returns the path
+    of the video. Can run in a worker process.
+    With workers > 1, the timeline is rendered in that many segments in parallel, and
+    with render_mode="ffmpeg", ffmpeg composites the overlays, see add_captions.
+    """
+    start = job["video_start"]
+    clip = VideoFileClip(job["video_path"]).subclip(
+        start, start + job["video_duration"]
+    )
     add_captions(
         video=clip,
-        audio_file=audio_file,
+        audio_file=job["audio_file"],
         img_file=img_file,
-        output_file=video_output_file,
+        output_file=job["output_file"],
+        video_start=start,
+        segments=job["segments"],
+        workers=workers,
+        render_mode=render_mode,
+        preset=preset,
+    )
+    return job["output_file"]
+
+
+def generate_video(
+    img_file: Optional[TitleImage],
+    transcript: str,
+    post_title: str,
+    workers: int = RENDER_SEGMENT_WORKERS,
+    render_mode: str = RENDER_MODE,
+    preset: str = RENDER_PRESET,
+) -> str:
+    """
+    Generates a video with captions and optional image overlay, using the transcript and post title.
+    Returns the path of the video.
+    """
+    return render_video(
+        prepare_video(transcript, post_title), img_file, workers, render_mode, preset
     )